@@ -0,0 +1,745 @@
+"""
+Headless benchmarks for Ghost Survivor.
+
+pyxel is replaced by a no-op stand-in, so nothing opens a window.
+
+    python benchmark.py frame              # App.update() frame time at 500, 2000 and 10000 ghosts
+    python benchmark.py frame 1000 4000 --frames 60
+    python benchmark.py chase              # per-object vs batched chase movement at 1k, 5k and 20k ghosts
+    python benchmark.py orbs               # per-object vs field EXP orb pass at 10k, 50k and 100k orbs
+    python benchmark.py pools              # projectile spawns, allocations and overflow per frame at 500 and 2000 ghosts
+    python benchmark.py memory             # App.memory_report() with 2000 ghosts and 20000 EXP orbs, bytes per instance
+    python benchmark.py endless            # endless mode minutes 0-10 with its own spawning, under the entity budget
+    python benchmark.py endless --no-budget
+    python benchmark.py endless --no-budget --no-merge   # ... and without EXP orb merging
+    python benchmark.py horde              # a wave of 1024 and 4096 Normal Ghosts spawned individually vs as hordes
+    python benchmark.py states             # per-object vs state machine Shot Ghost updates at 1k, 4k and 16k ghosts
+    python benchmark.py waves              # spawn waves of 1k to 16k ghosts, per-ghost loop vs batch
+    python benchmark.py bullets            # enemy bullets as objects vs the bullet field at 1k, 4k and 16k bullets
+    python benchmark.py collisions         # per layer pair collision time and contacts at 2000 ghosts under fire
+    python benchmark.py crowd              # crowd separation cost and spread at 200 to 20k chasing ghosts
+    python benchmark.py sweep              # player bullets crossing a wall of ghosts at 2 to 32 px/frame, end position vs swept
+    python benchmark.py aoe                # 1 to 64 meteor explosions over 2000 ghosts, full scans vs one AoE query
+    python benchmark.py satellites         # 5 to 40 satellites around the player in 200 and 2000 ghosts, one by one vs as an orbit
+
+The frame benchmark enables every weapon skill so all collision passes are exercised.
+"""
+import argparse
+import gc
+import itertools
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+
+# --- Headless pyxel stand-in ---
+class HeadlessPyxel(types.ModuleType):
+    # Constants (KEY_*, COLOR_*, GAMEPAD1_*) read as 0, every API call is a no-op
+    def __getattr__(self, name):
+        if name.isupper():
+            return 0
+        return lambda *args, **kwargs: None
+
+
+def install_headless_pyxel():
+    pyxel = HeadlessPyxel("pyxel")
+    pyxel.frame_count = 0
+    pyxel.width = 128
+    pyxel.height = 64
+    pyxel.btn = lambda key: False
+    pyxel.btnp = lambda key, *args, **kwargs: False
+    sys.modules["pyxel"] = pyxel
+    return pyxel
+
+
+def load_game():
+    pyxel = install_headless_pyxel()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import van # App() at the bottom of van.py returns immediately with the stand-in
+    return pyxel, van
+
+
+def make_app(van):
+    app = van.App.__new__(van.App) # Skip pyxel.init/run
+    app.reset_game()
+    app.hp = app.max_hp = 10 ** 9
+    app.game_state = "ENDLESS_MODE"
+    app.game_duration_frames = 10 ** 9 # Never reach GAME_CLEAR
+    app.exp_to_next_level = 10 ** 9 # Never open the level up menu
+    app.endless_spawn_schedule = van.SpawnSchedule([((), (), 0, 10 ** 9)]) # The benchmark controls the population itself
+
+    # Every weapon skill
+    app.attacks_per_interval = 4
+    app.attack_interval = 10
+    app.can_spawn_bullet = True
+    app.bullets_per_shot = 4
+    app.bullet_spawn_interval = 30
+    for _ in range(3):
+        app.satellites.append(van.Satellite(app.player_x, app.player_y, app.satellite_base_radius, random.uniform(3, 7)))
+    app.can_spawn_meteor = True
+    app.meteors_per_strike = 2
+    app.meteor_spawn_interval = 60
+    app.can_spawn_cutter = True
+    app.cutters_per_shot = 3
+    app.cutter_spawn_interval = 30
+    return app
+
+
+def new_ghost(van, app):
+    ghost_classes = [van.Enemy, van.ShotGhost, van.ShieldGhost, van.SuperShieldGhost, van.UltraShotGhost, van.BigNormalGhost]
+    ghost = random.choice(ghost_classes)(app.player_x, app.player_y)
+    # Place on screen so the ghost is neither culled nor idle
+    ghost.x = random.uniform(0, van.SCREEN_WIDTH - ghost.size)
+    ghost.y = random.uniform(0, van.SCREEN_HEIGHT - 8)
+    ghost.refresh_rect()
+    return ghost
+
+
+def top_up(van, app, count):
+    while len(app.enemies) < count:
+        app.enemies.add(new_ghost(van, app))
+    app.experience_orbs.clear() # Orbs are not part of this measurement
+
+
+def run_frames(pyxel, van, count, frames, warmup):
+    random.seed(0)
+    app = make_app(van)
+    total = 0.0
+    for frame in range(warmup + frames):
+        top_up(van, app, count)
+        pyxel.frame_count += 1
+        start = time.perf_counter()
+        app.update()
+        elapsed = time.perf_counter() - start
+        if frame >= warmup:
+            total += elapsed
+    return total / frames
+
+
+def bench_frame(pyxel, van, args):
+    print(f"{'ghosts':>8} {'ms/frame':>10}")
+    for count in args.counts or [500, 2000, 10000]:
+        ms = run_frames(pyxel, van, count, args.frames, args.warmup) * 1000
+        print(f"{count:>8} {ms:>10.2f}")
+
+
+def per_object_chase(ghost, player_x, player_y):
+    # Reference: the normalize-and-step each ghost class used to do in its own update()
+    dx = player_x - ghost.x
+    dy = player_y - ghost.y
+    dist = math.sqrt(dx * dx + dy * dy)
+    if dist != 0:
+        ghost.x += dx / dist * ghost.current_speed
+        ghost.y += dy / dist * ghost.current_speed
+
+
+def time_per_frame(step, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        step()
+    return (time.perf_counter() - start) / frames
+
+
+def bench_chase(pyxel, van, args):
+    print(f"{'ghosts':>8} {'per-object ms':>14} {'chase_step ms':>14} {'speedup':>8}")
+    for count in args.counts or [1000, 5000, 20000]:
+        random.seed(0)
+        app = make_app(van)
+        top_up(van, app, count)
+        ghosts = list(app.enemies)
+        player_x, player_y = app.player_x, app.player_y
+        per_object = time_per_frame(lambda: [per_object_chase(ghost, player_x, player_y) for ghost in ghosts], args.frames)
+        batched = time_per_frame(lambda: van.chase_step(ghosts, player_x, player_y), args.frames)
+        print(f"{count:>8} {per_object * 1000:>14.2f} {batched * 1000:>14.2f} {per_object / batched:>7.2f}x")
+
+
+class ReferenceOrb:
+    # Reference: the per-object ExperienceOrb the orb field replaced
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.collision_radius = 4
+        self.value = 1
+        self.attraction_speed = 0.5
+        self.dead = False
+
+    def update(self, player_x, player_y, player_attraction_range):
+        dx = player_x - self.x
+        dy = player_y - self.y
+        dist = math.sqrt(dx * dx + dy * dy)
+        if dist < player_attraction_range and dist != 0:
+            self.x += dx / dist * self.attraction_speed
+            self.y += dy / dist * self.attraction_speed
+
+    def get_rect(self):
+        return (self.x - self.collision_radius, self.y - self.collision_radius, self.collision_radius * 2, self.collision_radius * 2)
+
+
+def check_collision_rect(rect1, rect2):
+    # The rect overlap test App used before the CollisionWorld
+    x1, y1, w1, h1 = rect1
+    x2, y2, w2, h2 = rect2
+    return (x1 < x2 + w2 and
+            x1 + w1 > x2 and
+            y1 < y2 + h2 and
+            y1 + h1 > y2)
+
+
+def per_object_orbs(app, orbs, player_rect, clear_rects):
+    # One frame of the old orb pass: update + pickup per orb, clearing per BigNormalGhost, then compaction
+    exp = 0
+    for orb in orbs:
+        orb.update(app.player_x, app.player_y, app.exp_attraction_range)
+        if check_collision_rect(player_rect, orb.get_rect()):
+            orb.dead = True
+            exp += orb.value
+    for clear_rect in clear_rects:
+        for orb in orbs:
+            if not orb.dead and clear_rect[0] < orb.x < clear_rect[0] + clear_rect[2] and \
+               clear_rect[1] < orb.y < clear_rect[1] + clear_rect[3]:
+                orb.dead = True
+    return exp, [orb for orb in orbs if not orb.dead]
+
+
+def field_orbs(app, field, player_rect, clear_rects):
+    field.attract(app.player_x, app.player_y, app.exp_attraction_range)
+    exp = field.collect(player_rect)
+    field.clear_in_rects(clear_rects)
+    return exp
+
+
+def bench_orbs(pyxel, van, args):
+    # Orbs are spread over the play area around the player (the attraction range is 50px by default),
+    # with four BigNormalGhosts clearing, and are re-seeded before every measured frame
+    print(f"{'orbs':>8} {'per-object ms':>14} {'field ms':>10} {'speedup':>8}")
+    for count in args.counts or [10000, 50000, 100000]:
+        random.seed(0)
+        app = make_app(van)
+        positions = [(random.uniform(-van.GRID_MARGIN, van.SCREEN_WIDTH + van.GRID_MARGIN),
+                      random.uniform(-van.GRID_MARGIN, van.SCREEN_HEIGHT + van.GRID_MARGIN)) for _ in range(count)]
+        player_rect = (app.player_x + 2, app.player_y + 2, 4, 4) # 4x4 player hitbox centred on the 8x8 sprite
+        clear_rects = []
+        for _ in range(4):
+            ghost = van.BigNormalGhost(app.player_x, app.player_y)
+            ghost.x = random.uniform(0, van.SCREEN_WIDTH - ghost.size)
+            ghost.y = random.uniform(0, van.SCREEN_HEIGHT - ghost.size)
+            clear_rects.append(ghost.get_exp_clear_rect())
+
+        per_object = 0.0
+        batched = 0.0
+        for _ in range(args.frames):
+            orbs = [ReferenceOrb(x, y) for x, y in positions]
+            start = time.perf_counter()
+            per_object_orbs(app, orbs, player_rect, clear_rects)
+            per_object += time.perf_counter() - start
+
+            field = van.ExperienceOrbField()
+            for x, y in positions:
+                field.add(x, y)
+            start = time.perf_counter()
+            field_orbs(app, field, player_rect, clear_rects)
+            batched += time.perf_counter() - start
+        print(f"{count:>8} {per_object / args.frames * 1000:>14.2f} {batched / args.frames * 1000:>10.2f} {per_object / batched:>7.2f}x")
+
+
+def bench_pools(pyxel, van, args):
+    # Before the pools every spawn allocated a new Bullet/Cutter, so spawns/frame is the old allocation rate
+    print(f"{'ghosts':>8} {'pool':>14} {'spawns/frame':>13} {'allocs/frame':>13} {'dropped':>8} {'refused':>8} {'peak':>6} {'capacity':>9}")
+    for count in args.counts or [500, 2000]:
+        random.seed(0)
+        app = make_app(van)
+        pools = {"bullets": app.bullets, "cutters": app.cutters} # Enemy bullets are a field, see "bullets"
+        before = {name: (pool.allocations, pool.spawned, pool.dropped, pool.refused) for name, pool in pools.items()}
+        peak = dict.fromkeys(pools, 0)
+        gc_before = sum(stat["collections"] for stat in gc.get_stats())
+        for _ in range(args.frames):
+            top_up(van, app, count)
+            pyxel.frame_count += 1
+            app.update()
+            for name, pool in pools.items():
+                peak[name] = max(peak[name], len(pool))
+        gc_runs = sum(stat["collections"] for stat in gc.get_stats()) - gc_before
+        for name, pool in pools.items():
+            allocations, spawned, dropped, refused = (now - then for now, then in zip((pool.allocations, pool.spawned, pool.dropped, pool.refused), before[name]))
+            print(f"{count:>8} {name:>14} {spawned / args.frames:>13.2f} {allocations / args.frames:>13.2f} {dropped:>8} {refused:>8} {peak[name]:>6} {pool.capacity:>9}")
+        print(f"{count:>8} {'gc runs':>14} {gc_runs:>13} over {args.frames} frames")
+
+
+def traced_bytes_per_instance(make, count=1000):
+    # Allocation cost per object as tracemalloc sees it (includes any per-instance __dict__)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make() for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def bench_memory(pyxel, van, args):
+    orb_count = 20000
+    for count in args.counts or [2000]:
+        random.seed(0)
+        app = make_app(van)
+        for frame in range(args.frames):
+            top_up(van, app, count)
+            pyxel.frame_count += 1
+            app.update()
+        for _ in range(orb_count):
+            app.experience_orbs.add(random.uniform(0, van.SCREEN_WIDTH), random.uniform(0, van.SCREEN_HEIGHT))
+        print(f"memory_report() after {args.frames} frames at {count} ghosts, {orb_count} orbs")
+        print(f"{'type':>16} {'live':>7} {'bytes/each':>11} {'total KiB':>10}")
+        for name, live, each, total in app.memory_report():
+            print(f"{name:>16} {live:>7} {each:>11} {total / 1024:>10.1f}")
+
+    print()
+    print(f"{'type':>16} {'traced bytes/instance':>22}")
+    px, py = 60, 30
+    makers = [
+        ("Enemy", lambda: van.Enemy(px, py)),
+        ("ShotGhost", lambda: van.ShotGhost(px, py)),
+        ("ShieldGhost", lambda: van.ShieldGhost(px, py)),
+        ("SuperShieldGhost", lambda: van.SuperShieldGhost(px, py)),
+        ("UltraShotGhost", lambda: van.UltraShotGhost(px, py)),
+        ("BigNormalGhost", lambda: van.BigNormalGhost(px, py)),
+        ("Attack", lambda: van.Attack(px, py, 0, 0, True)),
+        ("Satellite", lambda: van.Satellite(px, py, 16, 5)),
+        ("Bullet", lambda: van.Bullet(px, py, random.random(), random.random())),
+        ("Meteor", lambda: van.Meteor(140.0, -10.0, 30.5, 20.5)),
+        ("Cutter", lambda: van.Cutter(px, py, random.uniform(0, 360), 2.0, 3, 1)),
+    ]
+    for name, make in makers:
+        print(f"{name:>16} {traced_bytes_per_instance(make):>22.1f}")
+    field = van.ExperienceOrbField()
+    orb_bytes = traced_bytes_per_instance(lambda: field.add(random.random(), random.random()), orb_count) # Only the field grows
+    print(f"{'ExperienceOrb':>16} {orb_bytes:>22.1f}")
+
+
+def ghost_population(app):
+    # Live ghosts, counting each horde as its members (as the entity budget does)
+    return sum(ghost.count if ghost.kind == "horde" else 1 for ghost in app.enemies if not ghost.dead)
+
+
+def bench_endless(pyxel, van, args):
+    # Real endless-mode spawning (2^minutes ghosts every 30 frames); each minute is sampled for
+    # --frames frames by jumping frame_count to the start of that minute.
+    # --no-budget lifts ENTITY_BUDGET, which make_room() reads on every wave, so nothing is capped
+    if args.no_budget:
+        van.ENTITY_BUDGET = 10 ** 9
+    if args.no_merge:
+        van.ExperienceOrbField.merge_radius = 0
+    minutes = args.counts or list(range(11))
+    random.seed(0)
+    app = make_app(van)
+    app.endless_spawn_schedule = van.compile_spawn_schedule(van.endless_spawn_curve, van.ENDLESS_SCHEDULE_FRAMES)
+    app.endless_mode_start_time = pyxel.frame_count
+    print(f"budget {van.ENTITY_BUDGET} ({van.ENTITY_BUDGET_POLICY})")
+    print(f"{'minute':>7} {'ms/frame':>9} {'ghosts':>7} {'e_bullets':>10} {'orbs':>6} {'orb exp':>8} {'evicted':>8} {'deferred':>9}")
+    for minute in minutes:
+        pyxel.frame_count = max(pyxel.frame_count, app.endless_mode_start_time + minute * 60 * 30)
+        app.activation_queue.cursor = pyxel.frame_count # Don't walk the skipped frames
+        evicted_before = app.evicted_count
+        total = 0.0
+        for _ in range(args.frames):
+            pyxel.frame_count += 1
+            start = time.perf_counter()
+            app.update()
+            total += time.perf_counter() - start
+        print(f"{minute:>7} {total / args.frames * 1000:>9.2f} {ghost_population(app):>7} {len(app.enemy_bullets):>10} "
+              f"{len(app.experience_orbs):>6} {sum(app.experience_orbs.values):>8} {app.evicted_count - evicted_before:>8} "
+              f"{app.deferred_spawns:>9}")
+
+
+def bench_horde(pyxel, van, args):
+    # The same spawn wave as individual ghosts and as HORDE_MAX_SIZE packs, timed while it approaches
+    print(f"{'wave':>6} {'individual ms':>14} {'entities':>9} {'horde ms':>9} {'entities':>9}")
+    for count in args.counts or [1024, 4096]:
+        results = []
+        for as_hordes in (False, True):
+            random.seed(0)
+            app = make_app(van)
+            if as_hordes:
+                for start in range(0, count, van.HORDE_MAX_SIZE):
+                    app.enemies.add(van.Horde(van.Enemy, min(van.HORDE_MAX_SIZE, count - start), app.player_x, app.player_y))
+            else:
+                for _ in range(count):
+                    app.enemies.add(van.Enemy(app.player_x, app.player_y))
+            entities = len(app.enemies)
+            total = 0.0
+            for _ in range(args.frames):
+                pyxel.frame_count += 1
+                start = time.perf_counter()
+                app.update()
+                total += time.perf_counter() - start
+            results.append((total / args.frames * 1000, entities))
+        (individual_ms, individual_entities), (horde_ms, horde_entities) = results
+        print(f"{count:>6} {individual_ms:>14.2f} {individual_entities:>9} {horde_ms:>9.2f} {horde_entities:>9}")
+
+
+class ReferenceShotGhost:
+    # Reference: the string-state ShotGhost.update() the state machine replaced
+    __slots__ = ("state", "state_timer", "current_speed", "bullet_fired")
+    base_speed = 0.3
+    state_duration_frames = 30
+
+    def __init__(self):
+        self.state = "ACCEL"
+        self.state_timer = 0
+        self.current_speed = 0.0
+        self.bullet_fired = False
+
+    def update(self):
+        self.state_timer += 1
+        if self.state == "ACCEL":
+            t = self.state_timer / self.state_duration_frames
+            self.current_speed = self.base_speed * min(1.0, t)
+            if self.state_timer >= self.state_duration_frames:
+                self.state = "DECEL"
+                self.state_timer = 0
+                self.bullet_fired = False
+        elif self.state == "DECEL":
+            t = self.state_timer / self.state_duration_frames
+            self.current_speed = self.base_speed * (1.0 - min(1.0, t))
+            if self.state_timer >= self.state_duration_frames:
+                self.state = "IDLE"
+                self.state_timer = 0
+        elif self.state == "IDLE":
+            self.current_speed = 0.0
+            if not self.bullet_fired:
+                self.bullet_fired = True
+            if self.state_timer >= self.state_duration_frames:
+                self.state = "ACCEL"
+                self.state_timer = 0
+
+
+def bench_states(pyxel, van, args):
+    # Shot Ghost state updates, per-object string compares vs the batched state machine, with the ghosts
+    # spawned over 20 waves (one cohort each) 30 frames apart, as endless mode does
+    waves = 20
+    print(f"{'ghosts':>8} {'per-object ms':>14} {'fsm ms':>7} {'speedup':>8} {'cohorts':>8}")
+    for count in args.counts or [1000, 4000, 16000]:
+        random.seed(0)
+        app = make_app(van)
+        fsm = app.enemies.machines["shot"]
+        references = []
+        for wave in range(waves):
+            for _ in range(count // waves):
+                app.enemies.add(van.ShotGhost(app.player_x, app.player_y))
+                references.append(ReferenceShotGhost())
+            for _ in range(30): # Age the wave
+                van.ShotGhost.update_all((), fsm, app.player_x, app.player_y)
+                for ghost in references:
+                    ghost.update()
+        per_object = time_per_frame(lambda: [ghost.update() for ghost in references], args.frames)
+        batched = time_per_frame(lambda: van.ShotGhost.update_all((), fsm, app.player_x, app.player_y), args.frames)
+        cohorts = len(fsm.cohorts)
+        print(f"{count:>8} {per_object * 1000:>14.2f} {batched * 1000:>7.2f} {per_object / batched:>7.1f}x {cohorts:>8}")
+
+
+def ring_origins(van, count, ring):
+    # Origins of enough ring volleys for count bullets, all on screen
+    return [(random.uniform(0, van.SCREEN_WIDTH), random.uniform(0, van.SCREEN_HEIGHT)) for _ in range(count // ring.count)]
+
+
+class ReferenceEnemyBullet:
+    # Reference: the per-object 4x4 enemy Bullet the bullet field replaced
+    __slots__ = ("x", "y", "vx", "vy", "life", "damage", "drops_exp", "dead")
+    size = 4
+
+    def __init__(self, x, y, target_x, target_y, speed, damage, drops_exp):
+        self.x = x
+        self.y = y
+        self.life = 120
+        self.damage = damage
+        self.drops_exp = drops_exp
+        self.dead = False
+        dx = target_x - x
+        dy = target_y - y
+        dist = math.sqrt(dx * dx + dy * dy)
+        self.vx = dx / dist * speed if dist else 0
+        self.vy = dy / dist * speed if dist else 0
+
+    def update(self):
+        self.x += self.vx
+        self.y += self.vy
+        self.life -= 1
+
+    def is_alive(self, screen_width, screen_height):
+        is_off_screen = (self.x < -self.size or self.x > screen_width + self.size or
+                         self.y < -self.size or self.y > screen_height + self.size)
+        return self.life > 0 and not is_off_screen
+
+
+def per_object_volley(van, ring, origins, target_x, target_y):
+    # Reference: one bullet object per bullet, each normalizing its own direction
+    return [ReferenceEnemyBullet(x, y, x + c, y + s, ring.speed, ring.damage, ring.drops_exp)
+            for x, y in origins for c, s in ring.offsets]
+
+
+def per_object_bullets(van, bullets):
+    # Reference: the per-bullet update() and is_alive() of the old enemy bullet loop, then the pool's compact()
+    for bullet in bullets:
+        bullet.update()
+        if not bullet.is_alive(van.SCREEN_WIDTH, van.SCREEN_HEIGHT):
+            bullet.dead = True
+    bullets[:] = [bullet for bullet in bullets if not bullet.dead]
+
+
+def field_bullets(field):
+    field.update()
+    field.compact()
+
+
+def bench_bullets(pyxel, van, args):
+    # Enemy bullets from ring volleys: emitting one volley per origin and moving them, as Bullet objects
+    # vs the EnemyBulletField, then App.update() with that many bullets kept on screen (every weapon, 100 ghosts)
+    ring = van.BULLET_PATTERNS["ring"]
+    print(f"{'bullets':>8} {'emit obj ms':>12} {'emit field ms':>14} {'move obj ms':>12} {'move field ms':>14} {'speedup':>8} {'app ms/frame':>13}")
+    for count in args.counts or [1000, 4000, 16000]:
+        random.seed(0)
+        origins = ring_origins(van, count, ring)
+        start = time.perf_counter()
+        bullets = per_object_volley(van, ring, origins, 64, 32)
+        emit_objects = time.perf_counter() - start
+        field = van.EnemyBulletField(count)
+        start = time.perf_counter()
+        field.emit(ring, origins, 64, 32)
+        emit_field = time.perf_counter() - start
+        move_objects = time_per_frame(lambda: per_object_bullets(van, bullets), args.frames)
+        move_field = time_per_frame(lambda: field_bullets(field), args.frames)
+
+        app = make_app(van)
+        app.enemy_bullets.capacity = count
+        total = 0.0
+        for frame in range(args.warmup + args.frames):
+            top_up(van, app, 100)
+            room = count - len(app.enemy_bullets)
+            app.enemy_bullets.emit(ring, ring_origins(van, room, ring), 0, 0)
+            pyxel.frame_count += 1
+            start = time.perf_counter()
+            app.update()
+            if frame >= args.warmup:
+                total += time.perf_counter() - start
+        print(f"{count:>8} {emit_objects * 1000:>12.2f} {emit_field * 1000:>14.2f} {move_objects * 1000:>12.2f} "
+              f"{move_field * 1000:>14.2f} {move_objects / move_field:>7.1f}x {total / args.frames * 1000:>13.2f}")
+
+
+def bench_collisions(pyxel, van, args):
+    # CollisionWorld counters over a run like the frame benchmark, with 2000 enemy bullets kept on screen
+    ring = van.BULLET_PATTERNS["ring"]
+    for count in args.counts or [2000]:
+        random.seed(0)
+        app = make_app(van)
+        for frame in range(args.warmup + args.frames):
+            if frame == args.warmup: # Counters are running totals; start measuring here
+                app.collisions = van.CollisionWorld()
+            top_up(van, app, count)
+            app.enemy_bullets.emit(ring, ring_origins(van, 2000 - len(app.enemy_bullets), ring), 0, 0)
+            pyxel.frame_count += 1
+            app.update()
+        world = app.collisions
+        print(f"{count} ghosts, 2000 enemy bullets, {world.frames} frames")
+        print(f"{'layer pair':>28} {'ms/frame':>9} {'contacts/frame':>15}")
+        print(f"{'broadphase':>28} {world.broadphase_time / world.frames * 1000:>9.3f}")
+        for first, second, handler in van.COLLISION_MATRIX:
+            pair = f"{van.LAYER_NAMES[first]} x {van.LAYER_NAMES[second]}"
+            print(f"{pair:>28} {world.pair_times[first, second] / world.frames * 1000:>9.3f} "
+                  f"{world.pair_contacts[first, second] / world.frames:>15.1f}")
+
+
+def bench_sweep(pyxel, van, args):
+    # 1000 player bullets fly right through a column of 8px ghosts, one frame step at a time.
+    # Testing only where a bullet ends a frame misses ghosts it stepped over; swept collision doesn't
+    print(f"{'px/frame':>8} {'end hits':>9} {'swept hits':>11} {'end ms':>7} {'swept ms':>9}")
+    wall_x = van.SCREEN_WIDTH / 2
+    ghosts = []
+    for row in range(van.SCREEN_HEIGHT // 8):
+        ghost = van.Enemy(0, 0, wall_x, row * 8)
+        ghost.id = row
+        ghost.dead = False
+        ghosts.append(ghost)
+    for speed in args.counts or [2, 4, 8, 16, 32]:
+        random.seed(0)
+        starts = [(random.uniform(0, wall_x - 8), random.uniform(4, van.SCREEN_HEIGHT - 4)) for _ in range(1000)]
+        results = []
+        for swept in (False, True):
+            bullets = [van.Bullet(x, y, x + 1, y, speed=speed, size=4) for x, y in starts]
+            hit = set()
+            world = van.CollisionWorld()
+            start = time.perf_counter()
+            for frame in range(math.ceil(van.SCREEN_WIDTH / speed)):
+                for bullet in bullets:
+                    bullet.update()
+                world.clear()
+                world.add(van.LAYER_GHOST, ghosts, [ghost.get_rect() for ghost in ghosts])
+                motions = [bullet.get_motion() for bullet in bullets] if swept else None
+                world.add(van.LAYER_PLAYER_BULLET, bullets, [bullet.get_rect() for bullet in bullets], motions)
+                hit.update(id(bullet) for bullet, ghost in world.contacts(van.LAYER_PLAYER_BULLET, van.LAYER_GHOST))
+            results += [len(hit), (time.perf_counter() - start) * 1000]
+        end_hits, end_ms, swept_hits, swept_ms = results
+        print(f"{speed:>8} {end_hits:>9} {swept_hits:>11} {end_ms:>7.1f} {swept_ms:>9.1f}")
+
+
+def full_scan(ghosts, rects):
+    # Every ghost tested against every explosion, as a per-explosion loop would
+    return [[ghost for ghost in ghosts
+             if x < ghost.x + ghost.size and x + w > ghost.x and y < ghost.y + ghost.height and y + h > ghost.y]
+            for x, y, w, h in rects]
+
+
+def bench_aoe(pyxel, van, args):
+    # Explosions (meteor-sized rects, and circles of about the same area) over 2000 ghosts on screen:
+    # a full scan of every ghost per explosion vs one batched CollisionWorld.query()
+    random.seed(0)
+    ghosts = [van.Enemy(0, 0, random.uniform(0, van.SCREEN_WIDTH - 8), random.uniform(0, van.SCREEN_HEIGHT - 8))
+              for _ in range(2000)]
+    world = van.CollisionWorld()
+    world.add(van.LAYER_GHOST, ghosts, [ghost.rect for ghost in ghosts])
+    print(f"{'explosions':>10} {'hits':>6} {'scan ms':>8} {'query ms':>9} {'speedup':>8} {'circle ms':>10}")
+    for count in args.counts or [1, 4, 16, 64]:
+        centers = [(random.uniform(0, van.SCREEN_WIDTH), random.uniform(0, van.SCREEN_HEIGHT)) for _ in range(count)]
+        rects = [(x - 8, y - 8, 16, 16) for x, y in centers]
+        circles = [(x, y, 9) for x, y in centers]
+        queried = world.query(van.LAYER_GHOST, rects)
+        assert queried == full_scan(ghosts, rects) # Same ghosts, same order
+        scan_ms = time_per_frame(lambda: full_scan(ghosts, rects), args.frames) * 1000
+        query_ms = time_per_frame(lambda: world.query(van.LAYER_GHOST, rects), args.frames) * 1000
+        circle_ms = time_per_frame(lambda: world.query(van.LAYER_GHOST, circles), args.frames) * 1000
+        hits = sum(map(len, queried))
+        print(f"{count:>10} {hits:>6} {scan_ms:>8.3f} {query_ms:>9.3f} {scan_ms / query_ms:>7.1f}x {circle_ms:>10.3f}")
+
+
+def bench_satellites(pyxel, van, args):
+    # Satellites circling a player at the screen center among 200 and 2000 ghosts: satellite x ghost contacts,
+    # one satellite at a time (cell neighbourhoods) vs as one orbit band; the game switches at SATELLITE_ORBIT_MIN
+    player_x = van.SCREEN_WIDTH / 2 - 4
+    player_y = van.SCREEN_HEIGHT / 2 - 4
+    print(f"{'ghosts':>6} {'satellites':>10} {'contacts ms':>12} {'orbit ms':>9} {'speedup':>8} {'contacts':>9}")
+    for ghost_count, count in itertools.product([200, 2000], args.counts or [5, 10, 15, 20, 25, 30, 40]):
+        random.seed(0)
+        ghosts = [van.Enemy(0, 0, random.uniform(-16, van.SCREEN_WIDTH), random.uniform(-16, van.SCREEN_HEIGHT))
+                  for _ in range(ghost_count)]
+        satellites = [van.Satellite(player_x, player_y, 15, random.uniform(3, 7)) for _ in range(count)]
+        van.Satellite.update_all(satellites, player_x, player_y)
+        world = van.CollisionWorld()
+        world.add(van.LAYER_GHOST, ghosts, [ghost.rect for ghost in ghosts])
+        rects = [satellite.get_rect() for satellite in satellites]
+        world.add(van.LAYER_SATELLITE, satellites, rects)
+        cells = world.contacts(van.LAYER_SATELLITE, van.LAYER_GHOST)
+        cells_ms = time_per_frame(lambda: world.contacts(van.LAYER_SATELLITE, van.LAYER_GHOST), args.frames) * 1000
+        world.clear()
+        world.add(van.LAYER_GHOST, ghosts, [ghost.rect for ghost in ghosts])
+        world.add_orbit(van.LAYER_SATELLITE, satellites, rects, player_x + 4, player_y + 4)
+        assert world.contacts(van.LAYER_SATELLITE, van.LAYER_GHOST) == cells # Same contacts, same order
+        orbit_ms = time_per_frame(lambda: world.contacts(van.LAYER_SATELLITE, van.LAYER_GHOST), args.frames) * 1000
+        print(f"{ghost_count:>6} {count:>10} {cells_ms:>12.3f} {orbit_ms:>9.3f} {cells_ms / orbit_ms:>7.1f}x {len(cells):>9}")
+
+
+def crowd_spread(ghosts):
+    # Share of ghosts not stacked on another one (distinct 2px cells holding a ghost center)
+    cells = {(int((ghost.x + ghost.size / 2) // 2), int((ghost.y + ghost.height / 2) // 2)) for ghost in ghosts}
+    return len(cells) / len(ghosts)
+
+
+def bench_crowd(pyxel, van, args):
+    # Normal Ghosts scattered on screen chase a fixed player; without separation they pile up on it.
+    # Per-ghost cost of separation_step should stay flat as the crowd grows
+    print(f"{'ghosts':>8} {'chase ms':>9} {'separate ms':>12} {'us/ghost':>9} {'spread off':>11} {'spread on':>10}")
+    target_x = van.SCREEN_WIDTH / 2
+    target_y = van.SCREEN_HEIGHT / 2
+    for count in args.counts or [200, 1000, 5000, 20000]:
+        spreads = []
+        for separate in (False, True):
+            random.seed(0)
+            ghosts = []
+            for i in range(count):
+                ghost = van.Enemy(0, 0, random.uniform(0, van.SCREEN_WIDTH - 8), random.uniform(0, van.SCREEN_HEIGHT - 8))
+                ghost.id = i
+                ghost.dead = False
+                ghosts.append(ghost)
+            grid = van.SpatialHash(cell_size=van.SEPARATION_RADIUS)
+            chase = separation = 0.0
+            for _ in range(args.frames):
+                start = time.perf_counter()
+                van.chase_step(ghosts, target_x, target_y)
+                chase += time.perf_counter() - start
+                if separate:
+                    start = time.perf_counter()
+                    van.separation_step(ghosts, grid)
+                    separation += time.perf_counter() - start
+            spreads.append(crowd_spread(ghosts))
+        print(f"{count:>8} {chase / args.frames * 1000:>9.2f} {separation / args.frames * 1000:>12.2f} "
+              f"{separation / args.frames / count * 1e6:>9.2f} {spreads[0]:>10.0%} {spreads[1]:>9.0%}")
+
+
+def per_ghost_wave(van, app, spawn_types, count):
+    # The spawn loop as it was: one type draw, one constructor with its own edge draw and one insert per ghost
+    for _ in range(count):
+        app.enemies.add(van.GHOST_CLASSES[random.choice(spawn_types)](app.player_x, app.player_y))
+
+
+def bench_waves(pyxel, van, args):
+    # Wave creation time, per-ghost loop vs App.spawn_wave; individual ghosts only (no hordes)
+    spawn_types = list(van.GHOST_CLASSES)
+    print(f"{'wave':>6} {'per-ghost ms':>13} {'batch ms':>9} {'speedup':>8}")
+    for count in args.counts or [1000, 2000, 4000, 8000, 16000]:
+        results = []
+        for batch in (False, True):
+            random.seed(0)
+            app = make_app(van)
+            app.game_state = "PLAYING"
+            total = 0.0
+            for i in range(args.warmup + args.frames):
+                app.enemies.clear()
+                start = time.perf_counter()
+                if batch:
+                    app.spawn_wave(spawn_types, count)
+                else:
+                    per_ghost_wave(van, app, spawn_types, count)
+                if i >= args.warmup:
+                    total += time.perf_counter() - start
+            results.append(total / args.frames * 1000)
+        per_ghost_ms, batch_ms = results
+        print(f"{count:>6} {per_ghost_ms:>13.2f} {batch_ms:>9.2f} {per_ghost_ms / batch_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    for name, func, frames, help_text in [
+        ("frame", bench_frame, 30, "App.update() frame time with every weapon enabled"),
+        ("chase", bench_chase, 30, "per-object vs batched chase movement"),
+        ("orbs", bench_orbs, 30, "per-object vs field EXP orb attraction, pickup and clearing"),
+        ("pools", bench_pools, 300, "projectile pool spawns, allocations and overflow per frame"),
+        ("memory", bench_memory, 30, "memory report by entity type and bytes per instance"),
+        ("endless", bench_endless, 150, "endless mode frame time and population per minute"),
+        ("horde", bench_horde, 30, "one spawn wave as individual ghosts vs hordes"),
+        ("states", bench_states, 30, "per-object string state updates vs the batched state machine"),
+        ("bullets", bench_bullets, 30, "enemy bullet emission and motion, objects vs field, and frame time under fire"),
+        ("collisions", bench_collisions, 30, "collision time and contacts per layer pair"),
+        ("crowd", bench_crowd, 60, "crowd separation cost per ghost and how far a chasing crowd spreads"),
+        ("waves", bench_waves, 10, "spawn wave creation, per-ghost loop vs batch"),
+        ("sweep", bench_sweep, 1, "player bullets crossing a wall of ghosts, end position vs swept collision"),
+        ("aoe", bench_aoe, 30, "explosion queries over 2000 ghosts, full scans vs one batched AoE query"),
+        ("satellites", bench_satellites, 300, "satellite contacts, one by one vs as an orbit"),
+    ]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("counts", nargs="*", type=int, help="live entity counts")
+        sub.add_argument("--frames", type=int, default=frames, help="measured frames (waves for waves) per count")
+        sub.add_argument("--warmup", type=int, default=5, help="unmeasured frames (waves) per count")
+        if name == "endless":
+            sub.add_argument("--no-budget", action="store_true", help="lift the entity budget")
+            sub.add_argument("--no-merge", action="store_true", help="turn EXP orb merging off")
+        sub.set_defaults(func=func)
+    args = parser.parse_args()
+
+    pyxel, van = load_game()
+    args.func(pyxel, van, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 import pyxel
+import bisect
+import heapq
+import itertools
 import math
+import operator
 import random
+import sys
+import time
 
 # --- Screen Size ---
 SCREEN_WIDTH = 128
@@ -14,135 +20,360 @@ PLAY_AREA_HEIGHT = 62
 PLAY_AREA_X = (SCREEN_WIDTH - PLAY_AREA_WIDTH) // 2
 PLAY_AREA_Y = (SCREEN_HEIGHT - (60)) // 2 - 1 # Use original PLAY_AREA_HEIGHT (60) to calculate and fix Y coordinate
 
-# --- Enemy Class ---
-class Enemy:
-    def __init__(self, player_x, player_y):
-        spawn_edge = random.choice(["top", "bottom", "left", "right"])
-        self.size = 8 # Enemy image size
-        self.x = 0
-        self.y = 0
-
-        if spawn_edge == "top":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(-self.size * 2, -self.size)
-        elif spawn_edge == "bottom":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(SCREEN_HEIGHT + self.size, SCREEN_HEIGHT + self.size * 2)
-        elif spawn_edge == "left":
-            self.x = random.randint(-self.size * 2, -self.size)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-        elif spawn_edge == "right":
-            self.x = random.randint(SCREEN_WIDTH + self.size, SCREEN_WIDTH + self.size * 2)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-
-        self.speed = 0.5
-        self.hp = 1 # HP for normal enemies
-        self.last_hit_frame = -1 # Frame when last hit
-
-    def update(self, player_x, player_y):
-        dx = player_x - self.x
-        dy = player_y - self.y
-        dist = math.sqrt(dx * dx + dy * dy)
-        if dist != 0:
-            self.x += dx / dist * self.speed
-            self.y += dy / dist * self.speed
-
-    def draw(self):
-        pyxel.blt(int(self.x), int(self.y), 0, 16, 8, self.size, self.size, 0)
+# Ghost type tags (also the order ghosts are drawn in)
+ENEMY_KINDS = ("normal", "shot", "shield", "super_shield", "ultra_shot", "big_normal", "horde")
+# Ghost types with per-frame state (timers, firing); the others only chase the player
+STATEFUL_ENEMY_KINDS = ("shot", "shield", "super_shield", "ultra_shot")
+
+# Hordes: big endless waves send identical chasers (Normal/Big Normal Ghosts) as packs
+HORDE_MIN_SIZE = 8 # Fewer chasers of one type in a wave spawn individually
+HORDE_MAX_SIZE = 64 # Ghosts per pack
+HORDE_SPLIT_DISTANCE = 24 # Packs break up when their center is this close (px) to the player's
+HORDE_SPREAD = 4 # Members are scattered up to this many px when a pack splits
+
+# Crowd separation: ghosts on screen push apart (boids-style) so big waves spread out instead of stacking up.
+# Off by default: it costs about 6us per on-screen ghost per frame (benchmark.py crowd)
+CROWD_SEPARATION = False
+SEPARATION_RADIUS = 6 # Ghost centers closer than this (px) push each other apart; also the neighbor grid cell size
+SEPARATION_STRENGTH = 1.0 # Max push per frame (px), more than the fastest chase (0.8) so crowds hold their spacing
+SEPARATION_MAX_NEIGHBORS = 8 # Ghosts inspected per ghost, so the cost stays linear in dense crowds
+
+# Spatial hash grid for collision broadphase
+GRID_CELL_SIZE = 16 # Cell size in pixels (largest ghost and largest weapon hitbox, a meteor explosion, are 16x16)
+GRID_MARGIN = 32 # Grid extends past the screen by the ghost spawn margin (2 x 16px)
+
+# Collision layers: every collider belongs to one, and COLLISION_MATRIX lists the layer pairs that interact
+# (first layer, second layer, App method handling their contacts), in the order they are handled each frame.
+# An enemy bullet touching several player defenses is taken by the first pair it appears in.
+# Meteor explosions are area colliders (CollisionWorld.add_areas), matched against ghosts with one AoE query;
+# a full ring of satellites is an orbit (CollisionWorld.add_orbit), matched only against the ghosts in its band
+LAYER_PLAYER, LAYER_GHOST, LAYER_ATTACK, LAYER_PLAYER_BULLET, LAYER_ENEMY_BULLET, LAYER_SATELLITE, LAYER_METEOR, \
+    LAYER_CUTTER = range(8)
+LAYER_NAMES = ("player", "ghost", "attack", "player_bullet", "enemy_bullet", "satellite", "meteor", "cutter")
+COLLISION_MATRIX = (
+    (LAYER_PLAYER, LAYER_GHOST, "touch_ghosts"),
+    (LAYER_ATTACK, LAYER_GHOST, "hit_ghosts"),
+    (LAYER_PLAYER_BULLET, LAYER_GHOST, "shoot_ghosts"),
+    (LAYER_ENEMY_BULLET, LAYER_PLAYER, "hit_player"),
+    (LAYER_ENEMY_BULLET, LAYER_ATTACK, "block_enemy_bullets"),
+    (LAYER_ENEMY_BULLET, LAYER_PLAYER_BULLET, "trade_bullets"),
+    (LAYER_ENEMY_BULLET, LAYER_SATELLITE, "block_enemy_bullets"),
+    (LAYER_ENEMY_BULLET, LAYER_METEOR, "block_enemy_bullets"),
+    (LAYER_ENEMY_BULLET, LAYER_CUTTER, "block_enemy_bullets"),
+    (LAYER_SATELLITE, LAYER_GHOST, "hit_ghosts"),
+    (LAYER_METEOR, LAYER_GHOST, "blast_ghosts"),
+    (LAYER_CUTTER, LAYER_GHOST, "hit_ghosts"),
+)
+
+# Projectile pools: capacity and what to do when full
+# ("drop_oldest" recycles the oldest live projectile, "refuse" skips the new one)
+PLAYER_BULLET_POOL_SIZE = 128 # Bullets live 120 frames and fire at most every 30
+ENEMY_BULLET_CAPACITY = 4096 # Enemy bullets are columns of an EnemyBulletField, not pooled objects
+CUTTER_POOL_SIZE = 64 # Cutters live 150 frames and fire at most every 30
+PLAYER_BULLET_OVERFLOW = "drop_oldest"
+ENEMY_BULLET_OVERFLOW = "refuse"
+CUTTER_OVERFLOW = "drop_oldest"
+
+# From this many satellites on, they collide as one orbit. benchmark.py satellites: cell by cell is about twice
+# as fast at 5 and still ahead at 10, the two break even around 15-20, and the orbit wins 1.1-1.6x from 25 on
+SATELLITE_ORBIT_MIN = 20
+
+# EXP orbs closer than ORB_MERGE_RADIUS px coalesce into one orb holding their total value: each batch of
+# kill orbs when it is added, and every orb every ORB_MERGE_INTERVAL frames (0 radius turns merging off)
+ORB_MERGE_RADIUS = 4
+ORB_MERGE_INTERVAL = 30
+ORB_BIG_VALUE = 5 # Orbs worth at least this much are drawn bigger
+
+# Endless mode population budget: ghosts + enemy bullets + EXP orbs
+ENTITY_BUDGET = 2000
+# When a spawn wave doesn't fit in the room left: "evict" drops the lowest-value orbs, then the ghosts
+# farthest from the player; "defer" carries the extra ghosts over to later waves
+ENTITY_BUDGET_POLICY = "evict"
+
+# Spawn schedule: the difficulty curve is compiled into a table with one row per step (see SpawnSchedule)
+ENEMY_SPAWN_INTERVAL = 30 # Frames between spawn waves
+SPAWN_SCHEDULE_STEP = 30 # Frames per table row; curve breakpoints fall on whole steps
+ENDLESS_SCHEDULE_FRAMES = 30 * 60 * 30 # Endless curve is tabulated for 30 minutes, its last row holds after that
+
+# --- Spawn Positions ---
+def edge_spawn_position(size, depth):
+    # Random position just outside a random screen edge, size..depth px off screen
+    spawn_edge = random.choice(["top", "bottom", "left", "right"])
+    if spawn_edge == "top":
+        return random.randint(-size, SCREEN_WIDTH), random.randint(-depth, -size)
+    elif spawn_edge == "bottom":
+        return random.randint(-size, SCREEN_WIDTH), random.randint(SCREEN_HEIGHT + size, SCREEN_HEIGHT + depth)
+    elif spawn_edge == "left":
+        return random.randint(-depth, -size), random.randint(-size, SCREEN_HEIGHT)
+    else:
+        return random.randint(SCREEN_WIDTH + size, SCREEN_WIDTH + depth), random.randint(-size, SCREEN_HEIGHT)
+
+def edge_spawn_positions(count, size, depth):
+    """
+    Batch form of edge_spawn_position: positions for count ghosts, same distribution.
+    The edges are drawn in one call and each edge's coordinates in one list pass, with every randint
+    replaced by a scaled random.random(); returns (xs, ys) grouped by edge.
+    """
+    rand = random.random
+    along_x = SCREEN_WIDTH + size + 1 # Number of values in -size..SCREEN_WIDTH
+    along_y = SCREEN_HEIGHT + size + 1
+    spread = depth - size + 1 # Number of values in size..depth
+    edge_counts = [0, 0, 0, 0] # top, bottom, left, right
+    for edge in random.choices(range(4), k=count):
+        edge_counts[edge] += 1
+    top, bottom, left, right = edge_counts
+    xs = [int(rand() * along_x) - size for _ in range(top + bottom)]
+    ys = [-size - int(rand() * spread) for _ in range(top)]
+    ys += [SCREEN_HEIGHT + size + int(rand() * spread) for _ in range(bottom)]
+    xs += [-size - int(rand() * spread) for _ in range(left)]
+    xs += [SCREEN_WIDTH + size + int(rand() * spread) for _ in range(right)]
+    ys += [int(rand() * along_y) - size for _ in range(left + right)]
+    return xs, ys
+
+# --- Bullet Patterns (New) ---
+class BulletPattern:
+    """
+    Shape of one enemy volley; every origin fires count bullets at once:
+      aimed   at the target, spread degrees apart (a fan when count > 1)
+      ring    evenly around the origin, the first at angle degrees
+    Unit vectors are precomputed per pattern, so a volley costs one sqrt per origin (aimed) or none.
+    """
+    __slots__ = ("shape", "count", "spread", "angle", "speed", "damage", "drops_exp", "sprite", "offsets")
+
+    def __init__(self, shape, count=1, spread=0.0, angle=0.0, speed=1.0, damage=1, drops_exp=True, sprite=(32, 8)):
+        self.shape = shape
+        self.count = count
+        self.spread = spread
+        self.angle = angle
+        self.speed = speed
+        self.damage = damage # Damage each bullet deals
+        self.drops_exp = drops_exp # Whether bullets drop EXP when destroyed by player attacks
+        self.sprite = sprite # (u, v) of the 4x4 bullet in image 0
+        if shape == "aimed": # Rotations (cos, sin) away from the aimed direction
+            angles = [(i - (count - 1) / 2) * spread for i in range(count)]
+        else: # Unit vectors around the origin
+            angles = [angle + i * 360 / count for i in range(count)]
+        self.offsets = [(math.cos(math.radians(a)), math.sin(math.radians(a))) for a in angles]
+
+    def volley(self, origins, target_x, target_y):
+        # Positions and velocities (xs, ys, vxs, vys) of every bullet fired from origins
+        xs, ys, vxs, vys = [], [], [], []
+        speed = self.speed
+        if self.shape == "aimed":
+            for ox, oy in origins:
+                dx = target_x - ox
+                dy = target_y - oy
+                dist = math.sqrt(dx*dx + dy*dy)
+                if dist != 0:
+                    ux = dx / dist
+                    uy = dy / dist
+                else: # If target is at the same position, don't move
+                    ux = uy = 0.0
+                for c, s in self.offsets:
+                    xs.append(ox)
+                    ys.append(oy)
+                    vxs.append((ux * c - uy * s) * speed)
+                    vys.append((ux * s + uy * c) * speed)
+            return xs, ys, vxs, vys
+
+        directions = self.offsets
+        step_x = [c * speed for c, s in directions]
+        step_y = [s * speed for c, s in directions]
+        for ox, oy in origins:
+            xs += [ox] * len(directions)
+            ys += [oy] * len(directions)
+            vxs += step_x
+            vys += step_y
+        return xs, ys, vxs, vys
+
+# Volley shapes by name; ghost types pick theirs with the bullet_pattern field of ENEMY_TYPES
+BULLET_PATTERNS = {
+    "shot": BulletPattern("aimed", speed=0.5, damage=1, drops_exp=True, sprite=(32, 8)), # One slow bullet
+    "ultra_shot": BulletPattern("aimed", speed=1.0, damage=3, drops_exp=False, sprite=(48, 8)),
+    "ring": BulletPattern("ring", count=16, speed=0.6),
+}
+
+# --- Enemy Type Table (New) ---
+# Everything that differs between ghost types apart from behavior, one row per kind:
+#   size, height      hitbox (and sprite) width and height
+#   start_speed       current_speed at spawn (moved by chase_step)
+#   max_hp            HP at spawn
+#   sprite, flips     (u, v) in image 0; flipping sprites face the screen center
+#   contact_damage    damage dealt to the player on contact
+#   spawn_depth       spawns up to this far (px) outside the screen edge
+#   defeat_sound      (channel, sound) of the type's own defeat sound, None for the shared one
+#   exp_clear_radius  radius of EXP orbs cleared around the ghost, 0 for none
+#   bullet_pattern    BULLET_PATTERNS name of the volleys it fires, None for none
+# The behavior (per-frame state, damage rules) is the Ghost subclass with the same kind.
+DEFEAT_SOUND = (0, 2) # Shared defeat sound (channel, sound)
+ENEMY_TYPES = {
+    "normal": dict(
+        size=8, height=8, start_speed=0.5, max_hp=1, sprite=(16, 8), flips=False,
+        contact_damage=1, spawn_depth=16, defeat_sound=None, exp_clear_radius=0, bullet_pattern=None
+    ),
+    "shot": dict(
+        size=16, height=8, start_speed=0.0, max_hp=1, sprite=(32, 0), flips=True,
+        contact_damage=1, spawn_depth=32, defeat_sound=None, exp_clear_radius=0, bullet_pattern="shot"
+    ),
+    "shield": dict( # 1 HP to break the shield, 1 to defeat the body
+        size=8, height=8, start_speed=0.4, max_hp=2, sprite=(32, 16), flips=True,
+        contact_damage=1, spawn_depth=16, defeat_sound=None, exp_clear_radius=0, bullet_pattern=None
+    ),
+    "super_shield": dict( # 3 HP for the shield (Green, Blue, Red), 1 for the body
+        size=8, height=8, start_speed=0.4, max_hp=4, sprite=(32, 32), flips=True,
+        contact_damage=1, spawn_depth=16, defeat_sound=(1, 7), exp_clear_radius=0, bullet_pattern=None
+    ),
+    "ultra_shot": dict( # Spawns further outside the screen than the others (4 x size)
+        size=16, height=8, start_speed=0.0, max_hp=1, sprite=(48, 0), flips=True,
+        contact_damage=1, spawn_depth=64, defeat_sound=None, exp_clear_radius=0, bullet_pattern="ultra_shot"
+    ),
+    "big_normal": dict(
+        size=16, height=16, start_speed=0.5, max_hp=1, sprite=(32, 40), flips=False,
+        contact_damage=3, spawn_depth=32, defeat_sound=None, exp_clear_radius=10, bullet_pattern=None
+    ),
+}
+
+# --- State Machine (New) ---
+# Integer states of the StateMachine behaviors
+SHOT_ACCEL, SHOT_DECEL, SHOT_IDLE, SHOT_FIRING = range(4) # Shot and Ultra Shot Ghosts (only Ultra fires in bursts)
+SHIELD_SHIELDED, SHIELD_DAMAGED_BLINK, SHIELD_RUSH = range(3) # Shield Ghosts
+METEOR_FLYING, METEOR_EXPLODING, METEOR_DONE = range(3) # Meteors
+
+class StateMachine:
+    """
+    Integer-state machine shared by every object of one behavior.
+    durations[state] is how many ticks the state lasts before switching to next_states[state]
+    (None: until changed by an event with enter()). Objects that entered the same state on the same
+    tick form a cohort; timed transitions move whole cohorts, and step() hands each cohort to the
+    behavior so per-state work is done once per cohort rather than once per object.
+    The machine counts its own ticks (one per step), so it stands still while the game is paused.
+    Members carry state, state_tick (tick they entered it) and fsm_cohort slots. Classes only describe
+    their machine (fsm_spec, the keyword arguments of StateMachine); the game owns the machines:
+    EnemyRegistry one per ghost kind, App the meteors' one.
+    """
+    __slots__ = ("durations", "next_states", "tick", "cohorts")
+
+    def __init__(self, durations, next_states):
+        self.durations = durations
+        self.next_states = next_states
+        self.tick = 0
+        self.cohorts = {} # (state, entry tick) -> {member: None}, in insertion order
+
+    def enter(self, obj, state):
+        # Put obj in state as of the current tick (also used to add new members)
+        if obj.fsm_cohort is not None:
+            del obj.fsm_cohort[obj]
+        cohort = self.cohorts.setdefault((state, self.tick), {})
+        cohort[obj] = None
+        obj.state = state
+        obj.state_tick = self.tick
+        obj.fsm_cohort = cohort
+
+    def remove(self, obj):
+        if obj.fsm_cohort is not None:
+            del obj.fsm_cohort[obj]
+            obj.fsm_cohort = None
+
+    def clear(self):
+        for cohort in self.cohorts.values():
+            for obj in cohort:
+                obj.fsm_cohort = None
+        self.cohorts.clear()
+
+    def step(self):
+        # Advance one tick and apply every timed transition that is due;
+        # returns the cohorts as (state, ticks in state, members)
+        self.tick += 1
+        tick = self.tick
+        cohorts = self.cohorts
+        durations = self.durations
+        for key in list(cohorts):
+            state, entered = key
+            members = cohorts[key]
+            if not members:
+                del cohorts[key]
+            elif durations[state] is not None and tick - entered >= durations[state]:
+                del cohorts[key]
+                next_state = self.next_states[state]
+                cohort = cohorts.setdefault((next_state, tick), {})
+                for obj in members:
+                    obj.state = next_state
+                    obj.state_tick = tick
+                    obj.fsm_cohort = cohort
+                cohort.update(members)
+        return [(state, tick - entered, members) for (state, entered), members in cohorts.items() if members]
+
+# --- Chaser Base Class (New) ---
+class Chaser:
+    """
+    Position, cached hitbox and registry bookkeeping shared by everything in EnemyRegistry:
+    single ghosts (Ghost) and packs of them (Horde). size and height come from the subclass.
+    """
+    __slots__ = ("x", "y", "current_speed", "last_hit_frame", "rect", "id", "dead")
 
     def is_outside_screen(self):
         margin = 20
         return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
                 self.y < -margin or self.y > SCREEN_HEIGHT + margin)
 
-    def take_damage(self):
-        if pyxel.frame_count == self.last_hit_frame:
-            return False # Already processed damage this frame
+    def refresh_rect(self):
+        # Recompute the cached hitbox; call after changing x/y
+        self.rect = (self.x, self.y, self.size, self.height)
 
-        self.last_hit_frame = pyxel.frame_count
-        self.hp -= 1
-        return self.hp <= 0
+    def get_rect(self):
+        # Return rectangle for collision detection (cached, refreshed when it moves)
+        return self.rect
+
+    def deals_contact_damage(self):
+        return True
+
+# --- Ghost Base Class (New) ---
+class Ghost(Chaser):
+    """
+    Shared spawning, damage and drawing for every ghost type.
+    Each subclass names its kind; the ENEMY_TYPES row for that kind is copied onto the class,
+    so subclasses only add behavior (per-frame state, damage rules, state-dependent sprites).
+    """
+    kind = None # Type tag used by EnemyRegistry
+    fsm_spec = None # StateMachine arguments for the type's per-frame state, if any
+    fsm = None # The type's StateMachine, set on each ghost by EnemyRegistry when it has one
+    __slots__ = ("hp",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for field, value in ENEMY_TYPES[cls.kind].items():
+            setattr(cls, field, value)
+
+    def __init__(self, player_x, player_y, x=None, y=None):
+        # x, y are given by batch spawns (App.spawn_wave); otherwise a random edge is picked here
+        if x is None:
+            x, y = edge_spawn_position(self.size, self.spawn_depth)
+        self.x = x
+        self.y = y
 
-# --- ShotGhost Class (New) ---
-class ShotGhost:
-    def __init__(self, player_x, player_y):
-        spawn_edge = random.choice(["top", "bottom", "left", "right"])
-        self.size = 16 # Image size 16x8
-        self.x = 0
-        self.y = 0
-
-        if spawn_edge == "top":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(-self.size * 2, -self.size)
-        elif spawn_edge == "bottom":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(SCREEN_HEIGHT + self.size, SCREEN_HEIGHT + self.size * 2)
-        elif spawn_edge == "left":
-            self.x = random.randint(-self.size * 2, -self.size)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-        elif spawn_edge == "right":
-            self.x = random.randint(SCREEN_WIDTH + self.size, SCREEN_WIDTH + self.size * 2)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-
-        self.base_speed = 0.3 # Slower max speed than normal ghosts
-        self.current_speed = 0.0
-        self.hp = 1
+        self.current_speed = self.start_speed
+        self.hp = self.max_hp
         self.last_hit_frame = -1 # Frame when last hit
+        self.refresh_rect() # Cached hitbox
 
-        self.state = "ACCEL" # ACCEL, DECEL, IDLE
-        self.state_timer = 0
-        self.state_duration_frames = 30 # 1 second (30 frames)
-
-        self.bullet_fired = False # Flag to fire bullet only once while idle
+    @classmethod
+    def update_all(cls, ghosts, fsm, player_x, player_y):
+        # Per-frame state of every live ghost of this type, one ghost at a time (fsm is the type's
+        # StateMachine, None without fsm_spec); returns the volleys fired as (BulletPattern, [(x, y) origin, ...]) pairs
+        for ghost in ghosts:
+            if not ghost.dead:
+                ghost.update(player_x, player_y)
+        return ()
 
-    def update(self, player_x, player_y):
-        self.state_timer += 1
-
-        if self.state == "ACCEL":
-            t = self.state_timer / self.state_duration_frames
-            self.current_speed = self.base_speed * min(1.0, t)
-            if self.state_timer >= self.state_duration_frames:
-                self.state = "DECEL"
-                self.state_timer = 0
-                self.bullet_fired = False # Reset to allow firing bullet in new phase
-
-        elif self.state == "DECEL":
-            t = self.state_timer / self.state_duration_frames
-            self.current_speed = self.base_speed * (1.0 - min(1.0, t))
-            if self.state_timer >= self.state_duration_frames:
-                self.state = "IDLE"
-                self.state_timer = 0
-
-        elif self.state == "IDLE":
-            self.current_speed = 0.0
-            if not self.bullet_fired:
-                # Fire bullet (handled by App class via return value)
-                self.bullet_fired = True
-            
-            if self.state_timer >= self.state_duration_frames: # Idle time also 1 second (30 frames)
-                self.state = "ACCEL"
-                self.state_timer = 0
-
-        dx = player_x - self.x
-        dy = player_y - self.y
-        dist = math.sqrt(dx * dx + dy * dy)
-        if dist != 0 and self.current_speed > 0: # Don't move when idle
-            self.x += dx / dist * self.current_speed
-            self.y += dy / dist * self.current_speed
-    
     def draw(self):
-        # Flip image according to direction
-        player_center_x = pyxel.width // 2
-        flip_x = 1
-        if self.x > player_center_x: # If to the right of player, face left
-            flip_x = -1
-        
-        pyxel.blt(int(self.x), int(self.y), 0, 32, 0, self.size * flip_x, 8, 0)
+        self.blit(*self.sprite)
 
-    def is_outside_screen(self):
-        margin = 20
-        return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
-                self.y < -margin or self.y > SCREEN_HEIGHT + margin)
+    def blit(self, u, v):
+        # Draw the sprite at (u, v); flipping types face left when right of the screen center
+        width = self.size
+        if self.flips and self.x > pyxel.width // 2:
+            width = -width
+        pyxel.blt(int(self.x), int(self.y), 0, u, v, width, self.height, 0)
 
     def take_damage(self):
         if pyxel.frame_count == self.last_hit_frame:
@@ -152,90 +383,103 @@ class ShotGhost:
         self.hp -= 1
         return self.hp <= 0
 
-# --- ShieldGhost Class (New) ---
-class ShieldGhost:
-    def __init__(self, player_x, player_y):
-        spawn_edge = random.choice(["top", "bottom", "left", "right"])
-        self.size = 8 # Image size 8x8
-        self.x = 0
-        self.y = 0
-
-        if spawn_edge == "top":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(-self.size * 2, -self.size)
-        elif spawn_edge == "bottom":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(SCREEN_HEIGHT + self.size, SCREEN_HEIGHT + self.size * 2)
-        elif spawn_edge == "left":
-            self.x = random.randint(-self.size * 2, -self.size)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-        elif spawn_edge == "right":
-            self.x = random.randint(SCREEN_WIDTH + self.size, SCREEN_WIDTH + self.size * 2)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-
-        self.initial_speed = 0.4 # Slightly slower than normal ghosts
-        self.rush_speed = 0.8 # Faster than normal ghosts
-        self.current_speed = self.initial_speed
-        
-        self.hp = 2 # 1 to break shield, 1 to defeat body
-        self.last_hit_frame = -1 # Frame when last hit
+    def get_exp_clear_rect(self):
+        # Returns a rectangle for EXP clearing, centered on the ghost
+        return (self.x + self.size // 2 - self.exp_clear_radius,
+                self.y + self.size // 2 - self.exp_clear_radius,
+                self.exp_clear_radius * 2,
+                self.exp_clear_radius * 2)
 
-        self.state = "SHIELDED" # SHIELDED, DAMAGED_BLINK, RUSH
-        self.state_timer = 0
-        self.blink_duration_frames = 30 # 1 second (30 frames)
-        self.blink_interval = 5 # Blink interval
-        self.player_blink_timer = 0 # Timer for blink display
+# --- Enemy Class ---
+class Enemy(Ghost):
+    kind = "normal" # Only chases the player (chase_step)
+    __slots__ = ()
 
-    def update(self, player_x, player_y):
-        if self.state == "DAMAGED_BLINK":
-            self.state_timer += 1
-            self.player_blink_timer += 1 # Update blink timer
-            if self.player_blink_timer >= self.blink_interval * 2:
-                self.player_blink_timer = 0
+# --- ShotGhost Class (New) ---
+class ShotGhost(Ghost):
+    kind = "shot"
+    base_speed = 0.3 # Slower max speed than normal ghosts
+    state_duration_frames = 30 # 1 second (30 frames)
+    # ACCEL -> DECEL -> IDLE -> ACCEL, 1 second each; fires one volley when going idle
+    fsm_spec = dict(
+        durations=(state_duration_frames, state_duration_frames, state_duration_frames, None),
+        next_states=(SHOT_DECEL, SHOT_IDLE, SHOT_ACCEL, None)
+    )
+    __slots__ = ("state", "state_tick", "fsm_cohort", "fsm")
+
+    def __init__(self, player_x, player_y, x=None, y=None):
+        super().__init__(player_x, player_y, x, y)
+        self.state = SHOT_ACCEL # Joins the state machine when added to the EnemyRegistry
+        self.state_tick = 0
+        self.fsm_cohort = None
+        self.fsm = None
+
+    @classmethod
+    def update_all(cls, ghosts, fsm, player_x, player_y):
+        # One speed per cohort, and a volley at the player from each ghost that just went idle.
+        # Movement at current_speed is done by chase_step (no movement while idle)
+        volleys = []
+        for state, elapsed, members in fsm.step():
+            if state == SHOT_ACCEL:
+                speed = cls.base_speed * min(1.0, elapsed / cls.state_duration_frames)
+            elif state == SHOT_DECEL:
+                speed = cls.base_speed * (1.0 - min(1.0, elapsed / cls.state_duration_frames))
+            elif elapsed == 0: # Just went idle
+                speed = 0.0
+                volleys.append((BULLET_PATTERNS[cls.bullet_pattern], [
+                    (ghost.x + ghost.size // 2, ghost.y + ghost.height // 2) for ghost in members if not ghost.dead
+                ]))
+            else:
+                continue # Still idle
+            for ghost in members:
+                ghost.current_speed = speed
+        return volleys
 
-            self.current_speed = 0.0 # Stop
-            if self.state_timer >= self.blink_duration_frames:
-                self.state = "RUSH"
-                self.current_speed = self.rush_speed
-                self.state_timer = 0
-                self.player_blink_timer = 0 # Reset blink timer
-        
-        dx = player_x - self.x
-        dy = player_y - self.y
-        dist = math.sqrt(dx * dx + dy * dy)
-        if dist != 0:
-            self.x += dx / dist * self.current_speed
-            self.y += dy / dist * self.current_speed
+# --- ShieldGhost Class (New) ---
+class ShieldGhost(Ghost):
+    kind = "shield"
+    rush_speed = 0.8 # Faster than normal ghosts
+    blink_duration_frames = 30 # 1 second (30 frames)
+    blink_interval = 5 # Blink interval
+    # SHIELDED until the first hit, then DAMAGED_BLINK (invincible, stopped) for 1 second, then RUSH
+    fsm_spec = dict(
+        durations=(None, blink_duration_frames, None),
+        next_states=(None, SHIELD_RUSH, None)
+    )
+    __slots__ = ("state", "state_tick", "fsm_cohort", "fsm")
+
+    def __init__(self, player_x, player_y, x=None, y=None):
+        super().__init__(player_x, player_y, x, y)
+        self.state = SHIELD_SHIELDED # Joins the state machine when added to the EnemyRegistry
+        self.state_tick = 0
+        self.fsm_cohort = None
+        self.fsm = None
+
+    @classmethod
+    def update_all(cls, ghosts, fsm, player_x, player_y):
+        # Ghosts whose blinking just ended rush; movement at current_speed is done by chase_step
+        for state, elapsed, members in fsm.step():
+            if state == SHIELD_RUSH and elapsed == 0:
+                for ghost in members:
+                    ghost.current_speed = cls.rush_speed
+        return ()
 
     def draw(self):
-        u = 0
-        v = 0
-        # Flip image according to direction
-        player_center_x = pyxel.width // 2
-        flip_x = 1
-        if self.x > player_center_x: # If to the right of player, face left
-            flip_x = -1
-
-        if self.state == "SHIELDED":
-            u = 32
-            v = 16
-        elif self.state == "DAMAGED_BLINK" or self.state == "RUSH":
-            u = 40
-            v = 16
-
         # Skip drawing only while blinking
-        if self.state == "DAMAGED_BLINK" and self.player_blink_timer % (self.blink_interval * 2) < self.blink_interval:
+        if self.state == SHIELD_DAMAGED_BLINK and \
+           (self.fsm.tick - self.state_tick) % (self.blink_interval * 2) < self.blink_interval:
             return
 
-        pyxel.blt(int(self.x), int(self.y), 0, u, v, self.size * flip_x, self.size, 0)
+        if self.state == SHIELD_SHIELDED:
+            self.blit(32, 16)
+        else: # DAMAGED_BLINK or RUSH
+            self.blit(40, 16)
 
-    def is_outside_screen(self):
-        margin = 20
-        return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
-                self.y < -margin or self.y > SCREEN_HEIGHT + margin)
+    def deals_contact_damage(self):
+        return self.state != SHIELD_DAMAGED_BLINK # No damage while invincible (blinking)
 
     def take_damage(self):
-        if self.state == "DAMAGED_BLINK": # Invincible while blinking
+        if self.state == SHIELD_DAMAGED_BLINK: # Invincible while blinking
             return False
 
         if pyxel.frame_count == self.last_hit_frame:
@@ -243,44 +487,26 @@ class ShieldGhost:
 
         self.last_hit_frame = pyxel.frame_count
         self.hp -= 1
-        if self.hp == 1 and self.state == "SHIELDED": # First damage taken
-            self.state = "DAMAGED_BLINK"
-            self.state_timer = 0
-            self.player_blink_timer = 0
+        if self.hp == 1 and self.state == SHIELD_SHIELDED: # First damage taken
+            self.fsm.enter(self, SHIELD_DAMAGED_BLINK)
+            self.current_speed = 0.0 # Stop
             return False # Not defeated yet
-        
+
         return self.hp <= 0 # Finally defeated
 
 # --- SuperShieldGhost Class (New) ---
-class SuperShieldGhost:
-    def __init__(self, player_x, player_y):
-        spawn_edge = random.choice(["top", "bottom", "left", "right"])
-        self.size = 8 # Image size 8x8
-        self.x = 0
-        self.y = 0
-
-        if spawn_edge == "top":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(-self.size * 2, -self.size)
-        elif spawn_edge == "bottom":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(SCREEN_HEIGHT + self.size, SCREEN_HEIGHT + self.size * 2)
-        elif spawn_edge == "left":
-            self.x = random.randint(-self.size * 2, -self.size)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-        elif spawn_edge == "right":
-            self.x = random.randint(SCREEN_WIDTH + self.size, SCREEN_WIDTH + self.size * 2)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-
-        self.speed = 0.4 # Base movement speed
-        self.hp = 4 # 3 hits for shield (Green, Blue, Red), 1 hit for body
-        self.last_hit_frame = -1 # Frame when last hit
-
+class SuperShieldGhost(Ghost):
+    kind = "super_shield"
+    invincible_duration = 10 # Brief invincibility (0.33 seconds)
+    blink_interval = 2 # Fast blink for invincibility
+    shield_sprites = {"GREEN": (32, 32), "BLUE": (40, 32), "RED": (32, 24), "BROKEN": (40, 24)}
+    __slots__ = ("shield_state", "invincible_timer", "blink_timer")
+
+    def __init__(self, player_x, player_y, x=None, y=None):
+        super().__init__(player_x, player_y, x, y)
         self.shield_state = "GREEN" # GREEN, BLUE, RED, BROKEN
         self.invincible_timer = 0
-        self.invincible_duration = 10 # Brief invincibility (0.33 seconds)
         self.blink_timer = 0
-        self.blink_interval = 2 # Fast blink for invincibility
 
     def update(self, player_x, player_y):
         if self.invincible_timer > 0:
@@ -290,45 +516,14 @@ class SuperShieldGhost:
                 self.blink_timer = 0
         else:
             self.blink_timer = 0
-
-        # Movement logic (always moves)
-        dx = player_x - self.x
-        dy = player_y - self.y
-        dist = math.sqrt(dx * dx + dy * dy)
-        if dist != 0:
-            self.x += dx / dist * self.speed
-            self.y += dy / dist * self.speed
+        # Movement is done by chase_step (always moves)
 
     def draw(self):
-        u = 0
-        v = 0
-        
-        # Determine image coordinates based on shield state
-        if self.shield_state == "GREEN":
-            u, v = 32, 32
-        elif self.shield_state == "BLUE":
-            u, v = 40, 32
-        elif self.shield_state == "RED":
-            u, v = 32, 24
-        elif self.shield_state == "BROKEN":
-            u, v = 40, 24
-
         # Apply blinking if invincible
         if self.invincible_timer > 0 and self.blink_timer % (self.blink_interval * 2) < self.blink_interval:
             return # Skip drawing to create blink effect
 
-        # Flip image according to direction (similar to other ghosts)
-        player_center_x = pyxel.width // 2
-        flip_x = 1
-        if self.x > player_center_x: # If to the right of player, face left
-            flip_x = -1
-        
-        pyxel.blt(int(self.x), int(self.y), 0, u, v, self.size * flip_x, self.size, 0)
-
-    def is_outside_screen(self):
-        margin = 20
-        return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
-                self.y < -margin or self.y > SCREEN_HEIGHT + margin)
+        self.blit(*self.shield_sprites[self.shield_state]) # Image depends on shield state
 
     def take_damage(self):
         if self.invincible_timer > 0:
@@ -354,209 +549,622 @@ class SuperShieldGhost:
         elif self.hp == 1:
             self.shield_state = "BROKEN"
             pyxel.play(0, 5) # Play shield break sound
-        
+
         return self.hp <= 0 # Return True if defeated
 
 # --- UltraShotGhost Class (New) ---
-class UltraShotGhost:
-    def __init__(self):
-        self.size = 16 # Image size 16x8 (note: collision size is 16, image is 16x8)
-
-        # Define a buffer distance outside the screen for spawning
-        # Increased spawn_buffer to make ghosts spawn further away from the player.
-        spawn_buffer = self.size * 4 # Spawn further outside the screen (increased from 2 to 4)
-
-        spawn_edge = random.choice(["top", "bottom", "left", "right"])
-        self.x = 0
-        self.y = 0
-
-        if spawn_edge == "top":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(-spawn_buffer, -self.size)
-        elif spawn_edge == "bottom":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(SCREEN_HEIGHT + self.size, SCREEN_HEIGHT + spawn_buffer)
-        elif spawn_edge == "left":
-            self.x = random.randint(-spawn_buffer, -self.size)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-        elif spawn_edge == "right":
-            self.x = random.randint(SCREEN_WIDTH + self.size, SCREEN_WIDTH + spawn_buffer)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-
-        self.base_speed = 0.5 # 速度を0.5に調整 (ゆっくりと移動)
-        self.current_speed = 0.0
-        self.hp = 1 # HPを1に戻す
-        self.last_hit_frame = -1
-
-        self.state = "ACCEL" # ACCEL, DECEL, IDLE, FIRING
-        self.state_timer = 0
-        self.state_duration_frames = 30 # 1 second (30 frames)
-
-        self.fire_count = 0
-        self.max_fire_count = 5 # Fires 5 bullets
-        self.fire_interval = 10 # Frames between each bullet shot
-        self.fire_timer = 0
-
-    def update(self, player_x, player_y):
-        bullet_to_fire = None
-
-        # state_timerは各状態ブロック内でインクリメントする
-        if self.state == "ACCEL":
-            self.state_timer += 1
-            t = self.state_timer / self.state_duration_frames
-            self.current_speed = self.base_speed * min(1.0, t)
-            if self.state_timer >= self.state_duration_frames:
-                self.state = "DECEL"
-                self.state_timer = 0
-
-        elif self.state == "DECEL":
-            self.state_timer += 1
-            t = self.state_timer / self.state_duration_frames
-            self.current_speed = self.base_speed * (1.0 - min(1.0, t))
-            if self.state_timer >= self.state_duration_frames:
-                self.state = "IDLE"
-                self.state_timer = 0
-                self.fire_count = 0 # Reset fire count for new firing sequence
-
-        elif self.state == "IDLE":
-            self.current_speed = 0.0 # Stop for firing
-            self.state_timer += 1
-            if self.state_timer >= self.state_duration_frames:
-                self.state = "FIRING"
-                self.state_timer = 0
-                self.fire_timer = 0 # Reset fire timer for the first shot
-
-        elif self.state == "FIRING":
-            self.current_speed = 0.0 # Stay still while firing
-            self.fire_timer += 1
-            if self.fire_timer >= self.fire_interval and self.fire_count < self.max_fire_count:
-                # Spawn a bullet
-                ghost_center_x = self.x + self.size // 2
-                ghost_center_y = self.y + 8 // 2 # Ultra Shot Ghost height is 8
-                bullet_to_fire = Bullet(
-                    ghost_center_x, ghost_center_y,
-                    player_x + 4, # Target player's center (player size 8x8, center is +4)
-                    player_y + 4,
-                    speed=1.0, # 弾丸速度を1.0に戻す
-                    size=4, # Bullet size 4x4
-                    damage=3, # Deals 3 damage
-                    drops_exp=False, # Does not drop EXP
-                    is_enemy_bullet=True
-                )
-                pyxel.play(1, 6) # Play sound 6 on channel 1 for UltraShotGhost bullet
-                self.fire_count += 1
-                self.fire_timer = 0 # Reset for next bullet
-
-            if self.fire_count >= self.max_fire_count and self.fire_timer >= self.fire_interval:
-                # All bullets fired, transition back to ACCEL
-                self.state = "ACCEL"
-                self.state_timer = 0
-
-        if self.current_speed > 0: # Only move if not idle/firing
-            dx = player_x - self.x
-            dy = player_y - self.y
-            dist = math.sqrt(dx * dx + dy * dy)
-            if dist != 0:
-                self.x += dx / dist * self.current_speed
-                self.y += dy / dist * self.current_speed
-        
-        return bullet_to_fire # Return bullet if fired this frame
-
-    def draw(self):
-        # Flip image according to direction
-        player_center_x = pyxel.width // 2
-        flip_x = 1
-        if self.x > player_center_x: # If to the right of player, face left
-            flip_x = -1
-        
-        pyxel.blt(int(self.x), int(self.y), 0, 48, 0, self.size * flip_x, 8, 0) # Ultra Shot Ghost image (48,0)
-
-    def is_outside_screen(self):
-        # Since they spawn in the play area, this check might be less critical for initial appearance
-        # but still useful for removing them if they somehow leave the screen during movement.
-        margin = 20
-        return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
-                self.y < -margin or self.y > SCREEN_HEIGHT + margin)
-
-    def take_damage(self):
-        if pyxel.frame_count == self.last_hit_frame:
-            return False # Already processed damage this frame
-
-        self.last_hit_frame = pyxel.frame_count
-        self.hp -= 1
-        return self.hp <= 0
+class UltraShotGhost(Ghost):
+    kind = "ultra_shot"
+    base_speed = 0.5 # 速度を0.5に調整 (ゆっくりと移動)
+    state_duration_frames = 30 # 1 second (30 frames)
+    max_fire_count = 5 # Fires 5 bullets
+    fire_interval = 10 # Frames between each bullet shot
+    # ACCEL -> DECEL -> IDLE, 1 second each, then FIRING: a bullet every fire_interval frames,
+    # max_fire_count times, and back to ACCEL one interval after the last
+    fsm_spec = dict(
+        durations=(state_duration_frames, state_duration_frames, state_duration_frames,
+                   fire_interval * (max_fire_count + 1)),
+        next_states=(SHOT_DECEL, SHOT_IDLE, SHOT_FIRING, SHOT_ACCEL)
+    )
+    __slots__ = ("state", "state_tick", "fsm_cohort", "fsm")
+
+    def __init__(self, player_x, player_y, x=None, y=None):
+        super().__init__(player_x, player_y, x, y)
+        self.state = SHOT_ACCEL # Joins the state machine when added to the EnemyRegistry
+        self.state_tick = 0
+        self.fsm_cohort = None
+        self.fsm = None
+
+    @classmethod
+    def update_all(cls, ghosts, fsm, player_x, player_y):
+        # One speed per cohort; firing cohorts shoot together on every fire_interval-th frame.
+        # Movement at current_speed is done by chase_step (no movement while idle/firing)
+        volleys = []
+        for state, elapsed, members in fsm.step():
+            if state == SHOT_ACCEL:
+                speed = cls.base_speed * min(1.0, elapsed / cls.state_duration_frames)
+            elif state == SHOT_DECEL:
+                speed = cls.base_speed * (1.0 - min(1.0, elapsed / cls.state_duration_frames))
+            elif state == SHOT_IDLE and elapsed == 0:
+                speed = 0.0 # Stop for firing
+            else:
+                if state == SHOT_FIRING and 0 < elapsed <= cls.fire_interval * cls.max_fire_count and \
+                   elapsed % cls.fire_interval == 0:
+                    # The App emits the volley into the enemy bullet field
+                    volleys.append((BULLET_PATTERNS[cls.bullet_pattern], [
+                        (ghost.x + ghost.size // 2, ghost.y + ghost.height // 2) for ghost in members if not ghost.dead
+                    ]))
+                    pyxel.play(1, 6) # Play sound 6 on channel 1 for UltraShotGhost bullet
+                continue # Standing still
+            for ghost in members:
+                ghost.current_speed = speed
+        return volleys
 
 # --- BigNormalGhost Class (New) ---
-class BigNormalGhost:
-    def __init__(self, player_x, player_y):
-        spawn_edge = random.choice(["top", "bottom", "left", "right"])
-        self.size = 16 # Image size 16x16
-        self.x = 0
-        self.y = 0
-
-        if spawn_edge == "top":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(-self.size * 2, -self.size)
-        elif spawn_edge == "bottom":
-            self.x = random.randint(-self.size, SCREEN_WIDTH)
-            self.y = random.randint(SCREEN_HEIGHT + self.size, SCREEN_HEIGHT + self.size * 2)
-        elif spawn_edge == "left":
-            self.x = random.randint(-self.size * 2, -self.size)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-        elif spawn_edge == "right":
-            self.x = random.randint(SCREEN_WIDTH + self.size, SCREEN_WIDTH + self.size * 2)
-            self.y = random.randint(-self.size, SCREEN_HEIGHT)
-
-        self.speed = 0.5 # Same speed as normal ghosts
-        self.hp = 1 # Single hit to defeat
-        self.last_hit_frame = -1 # Frame when last hit
-        self.exp_clear_radius = 10 # Radius to clear EXP orbs around it
+class BigNormalGhost(Ghost):
+    kind = "big_normal" # Chases like a normal ghost and clears EXP orbs around it
+    __slots__ = ()
+
+# Ghost class for each spawnable kind, used by App.spawn_wave
+GHOST_CLASSES = {
+    ghost_class.kind: ghost_class
+    for ghost_class in (Enemy, ShotGhost, ShieldGhost, SuperShieldGhost, UltraShotGhost, BigNormalGhost)
+}
+EXP_CLEARING_KINDS = tuple(kind for kind, row in ENEMY_TYPES.items() if row["exp_clear_radius"])
+
+# --- Horde Class (New) ---
+class Horde(Chaser):
+    """
+    A pack of identical chasers moving as one entity: a shared position, the member hitbox and an
+    HP pool of count x member HP. Area hits (meteors) damage every member at once; a single-target
+    hit, or getting close to the player, splits the pack into individual ghosts (App.split_horde).
+    """
+    kind = "horde" # Type tag used by EnemyRegistry
+    fsm_spec = None # Members have no per-frame state
+    fsm = None
+    __slots__ = ("leader", "member_class", "count", "member_hp", "size", "height", "contact_damage")
+
+    def __init__(self, member_class, count, player_x, player_y):
+        self.leader = member_class(player_x, player_y) # First member; spawn position and stats come from it
+        self.member_class = member_class
+        self.count = count
+        self.member_hp = self.leader.hp
+        self.x = self.leader.x
+        self.y = self.leader.y
+        self.size = self.leader.size
+        self.height = self.leader.height
+        self.current_speed = self.leader.current_speed # Moved by chase_step like any chaser
+        self.contact_damage = self.leader.contact_damage
+        self.last_hit_frame = -1
+        self.refresh_rect() # Cached hitbox
 
-    def update(self, player_x, player_y):
-        dx = player_x - self.x
-        dy = player_y - self.y
-        dist = math.sqrt(dx * dx + dy * dy)
-        if dist != 0:
-            self.x += dx / dist * self.speed
-            self.y += dy / dist * self.speed
+    @property
+    def hp(self):
+        return self.count * self.member_hp # HP pool
 
     def draw(self):
-        # Image for BigNormalGhost is at (32, 40) and is 16x16
-        pyxel.blt(int(self.x), int(self.y), 0, 32, 40, self.size, self.size, 0)
-
-    def is_outside_screen(self):
-        margin = 20
-        return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
-                self.y < -margin or self.y > SCREEN_HEIGHT + margin)
-
-    def take_damage(self):
+        # Drawn as the leader sprite with one offset copy behind it
+        for dx, dy in ((2, -2), (0, 0)):
+            self.leader.x = self.x + dx
+            self.leader.y = self.y + dy
+            self.leader.draw()
+
+    def take_area_damage(self):
+        # One hit on every member; returns how many died (members are identical, so all or none)
         if pyxel.frame_count == self.last_hit_frame:
-            return False # Already processed damage this frame
+            return 0 # Already processed damage this frame
 
         self.last_hit_frame = pyxel.frame_count
-        self.hp -= 1
-        return self.hp <= 0
+        self.member_hp -= 1
+        return self.count if self.member_hp <= 0 else 0
 
     def get_exp_clear_rect(self):
-        # Returns a rectangle for EXP clearing, centered on the ghost
-        return (self.x + self.size // 2 - self.exp_clear_radius,
-                self.y + self.size // 2 - self.exp_clear_radius,
-                self.exp_clear_radius * 2,
-                self.exp_clear_radius * 2)
+        # Packs of Big Normal Ghosts clear EXP orbs like their members
+        self.leader.x = self.x
+        self.leader.y = self.y
+        return self.leader.get_exp_clear_rect()
+
+# --- Chase Movement Kernel (New) ---
+def chase_step(ghosts, target_x, target_y):
+    """
+    Moves every ghost current_speed pixels straight toward (target_x, target_y).
+    One batched pass for all ghost types; update() methods only handle state.
+    """
+    sqrt = math.sqrt
+    for ghost in ghosts:
+        speed = ghost.current_speed
+        if speed > 0:
+            dx = target_x - ghost.x
+            dy = target_y - ghost.y
+            dist = sqrt(dx * dx + dy * dy)
+            if dist != 0:
+                step = speed / dist
+                ghost.x += dx * step
+                ghost.y += dy * step
+                ghost.rect = (ghost.x, ghost.y, ghost.size, ghost.height) # refresh_rect(), inlined for the hot loop
+
+def separation_step(ghosts, grid, radius=SEPARATION_RADIUS, strength=SEPARATION_STRENGTH,
+                    max_neighbors=SEPARATION_MAX_NEIGHBORS):
+    """
+    Boids-style separation: each ghost is pushed away from the ghosts whose centers are within radius,
+    up to strength pixels. Neighbors come from grid (cells of radius px, filed by center), and at most
+    max_neighbors are inspected per ghost. Pushes are computed from the current positions, then applied.
+    """
+    sqrt = math.sqrt
+    radius_sq = radius * radius
+    live = [ghost for ghost in ghosts if not ghost.dead]
+    xs = [ghost.x + ghost.size / 2 for ghost in live] # Centers, indexed like live
+    ys = [ghost.y + ghost.height / 2 for ghost in live]
+    grid.clear()
+    for i in range(len(live)):
+        grid.insert(i, xs[i], ys[i])
+
+    pushes = []
+    for cell, block in grid.neighborhoods(max_neighbors + 1): # + 1 for the ghost itself
+        for i in cell:
+            cx = xs[i]
+            cy = ys[i]
+            push_x = push_y = 0.0
+            for j in block:
+                dx = cx - xs[j]
+                dy = cy - ys[j]
+                dist_sq = dx * dx + dy * dy
+                if dist_sq < radius_sq:
+                    if dist_sq == 0: # Exactly stacked (or itself): the earlier ghost steps left, the later one right
+                        if i != j:
+                            push_x += 1.0 if i > j else -1.0
+                        continue
+                    dist = sqrt(dist_sq)
+                    weight = (radius - dist) / (radius * dist) # Unit vector away from the other, stronger when closer
+                    push_x += dx * weight
+                    push_y += dy * weight
+            if push_x or push_y:
+                pushes.append((live[i], push_x, push_y))
+
+    for ghost, push_x, push_y in pushes:
+        scale = strength / max(1.0, sqrt(push_x * push_x + push_y * push_y))
+        ghost.x += push_x * scale
+        ghost.y += push_y * scale
+        ghost.rect = (ghost.x, ghost.y, ghost.size, ghost.height)
+
+# --- EnemyRegistry Class (New) ---
+class EnemyRegistry:
+    """
+    Holds every live ghost under a stable integer id, tagged by its kind.
+    Insert and delete are O(1) (dicts keep spawn order), and per-kind views are kept alongside.
+    """
+    def __init__(self):
+        self.next_id = 0
+        self.entries = {} # id -> ghost, all kinds
+        self.by_kind = {kind: {} for kind in ENEMY_KINDS} # kind -> {id -> ghost}
+        # kind -> StateMachine of the ghosts of that kind, for the kinds with per-frame state
+        self.machines = {kind: StateMachine(**ghost_class.fsm_spec)
+                         for kind, ghost_class in GHOST_CLASSES.items() if ghost_class.fsm_spec}
+        self.dead = [] # Ghosts killed this frame, removed by compact()
+
+    def add(self, ghost):
+        ghost.id = self.next_id
+        ghost.dead = False
+        self.next_id += 1
+        self.entries[ghost.id] = ghost
+        self.by_kind[ghost.kind][ghost.id] = ghost
+        if ghost.kind in self.machines:
+            ghost.fsm = self.machines[ghost.kind]
+            ghost.fsm.enter(ghost, ghost.state)
+        return ghost.id
+
+    def add_many(self, ghosts):
+        # Bulk insert, e.g. a whole spawn wave; ids are consecutive in list order
+        entries = self.entries
+        by_kind = self.by_kind
+        machines = self.machines
+        ghost_id = self.next_id
+        for ghost in ghosts:
+            ghost.id = ghost_id
+            ghost.dead = False
+            entries[ghost_id] = ghost
+            by_kind[ghost.kind][ghost_id] = ghost
+            if ghost.kind in machines:
+                ghost.fsm = machines[ghost.kind]
+                ghost.fsm.enter(ghost, ghost.state)
+            ghost_id += 1
+        self.next_id = ghost_id
+
+    def remove(self, ghost):
+        if self.entries.pop(ghost.id, None) is not None:
+            del self.by_kind[ghost.kind][ghost.id]
+            if ghost.fsm is not None:
+                ghost.fsm.remove(ghost)
+
+    def kill(self, ghost):
+        # Mark dead in place; the entry stays (skipped by every pass) until compact()
+        if not ghost.dead:
+            ghost.dead = True
+            self.dead.append(ghost)
+
+    def compact(self):
+        # Remove everything killed this frame (called once, at the end of the frame)
+        for ghost in self.dead:
+            self.remove(ghost)
+        self.dead.clear()
+
+    def get(self, ghost_id):
+        return self.entries.get(ghost_id)
+
+    def of_kind(self, kind):
+        # Live view of one ghost type (do not add/remove while iterating it)
+        return self.by_kind[kind].values()
+
+    def clear(self):
+        for machine in self.machines.values():
+            machine.clear() # Members leave their cohorts with it
+        self.entries.clear()
+        self.dead.clear()
+        for ghosts in self.by_kind.values():
+            ghosts.clear()
+
+    def __iter__(self):
+        # Iterate in spawn order, dead entries included (do not add/remove while iterating)
+        return iter(self.entries.values())
+
+    def __len__(self):
+        return len(self.entries)
+
+# --- SpatialHash Class (New) ---
+class SpatialHash:
+    """
+    Uniform grid over the screen plus GRID_MARGIN on each side, used as a neighbor index
+    (separation_step files ghost centers in it). Each item is filed once, in the cell holding its
+    position; neighborhoods() hands out every occupied cell with the items around it.
+    Positions beyond the grid are clamped into the border cells, so nothing is ever missed.
+    """
+    def __init__(self, cell_size=GRID_CELL_SIZE, margin=GRID_MARGIN):
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cols = (SCREEN_WIDTH + margin * 2) // cell_size + 1
+        self.rows = (SCREEN_HEIGHT + margin * 2) // cell_size + 1
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+
+    def cell_coords(self, x, y):
+        col = int((x + self.margin) // self.cell_size)
+        row = int((y + self.margin) // self.cell_size)
+        col = max(0, min(col, self.cols - 1))
+        row = max(0, min(row, self.rows - 1))
+        return col, row
+
+    def clear(self):
+        for cell in self.cells:
+            cell.clear()
+
+    def insert(self, item, x, y):
+        col, row = self.cell_coords(x, y)
+        self.cells[row * self.cols + col].append(item)
+
+    def neighborhoods(self, limit):
+        # For every non-empty cell: (its items, up to limit items from it and the 8 cells around it, its own first)
+        cols = self.cols
+        cells = self.cells
+        for index, cell in enumerate(cells):
+            if not cell:
+                continue
+            row, col = divmod(index, cols)
+            block = cell[:limit]
+            for r in range(max(0, row - 1), min(row + 2, self.rows)):
+                for c in range(max(0, col - 1), min(col + 2, cols)):
+                    if len(block) >= limit:
+                        break
+                    if r != row or c != col:
+                        block += cells[r * cols + c][:limit - len(block)]
+            yield cell, block
+
+# --- Swept Collision (New) ---
+def sweep_time(x, y, w, h, dx, dy, ox, oy, ow, oh):
+    """
+    Swept AABB: the earliest time t in [0, 1] at which the box (x, y, w, h), moving by (dx, dy),
+    overlaps the box (ox, oy, ow, oh); None if it never does. Overlap is strict, as in
+    CollisionWorld.contacts(), so at t = 1 this agrees with testing the end position.
+    """
+    enter = 0.0
+    leave = 1.0
+    for start, delta, low, high in ((x, dx, ox - w, ox + ow), (y, dy, oy - h, oy + oh)):
+        # The box overlaps on this axis while low < start + delta * t < high
+        if delta == 0:
+            if not low < start < high:
+                return None
+            continue
+        t_low = (low - start) / delta
+        t_high = (high - start) / delta
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+        enter = max(enter, t_low)
+        leave = min(leave, t_high)
+        if enter >= leave:
+            return None
+    return enter
+
+def swept_contact(box, motion, other_box, other_motion):
+    # Time of first overlap of two colliders filed with their swept bounds (see CollisionWorld.add)
+    dx, dy = motion or (0, 0)
+    odx, ody = other_motion or (0, 0)
+    x, y, w, h = box
+    ox, oy, ow, oh = other_box
+    # Start rectangles, then the first collider's motion relative to the second
+    return sweep_time(x + max(-dx, 0), y + max(-dy, 0), w - abs(dx), h - abs(dy), dx - odx, dy - ody,
+                      ox + max(-odx, 0), oy + max(-ody, 0), ow - abs(odx), oh - abs(ody))
+
+# --- CollisionWorld Class (New) ---
+class CollisionWorld:
+    """
+    One broadphase and one narrowphase per frame for every collider pair in COLLISION_MATRIX.
+    Colliders are added a layer at a time and filed in the grid cell of their top-left corner;
+    for each layer pair, the colliders of the first layer in a cell are tested against the second
+    layer's colliders in the cells around it that they can reach. Colliders added with their motion
+    (fast projectiles) are filed with the bounds of their whole step and tested with swept AABB, so
+    they can't pass through a ghost between frames. Contacts come out sorted by the colliders'
+    positions in their layers, then by time of impact, so handlers see them in list order.
+    """
+    def __init__(self, cell_size=GRID_CELL_SIZE, margin=GRID_MARGIN):
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cols = (SCREEN_WIDTH + margin * 2) // cell_size + 1
+        self.rows = (SCREEN_HEIGHT + margin * 2) // cell_size + 1
+        self.layers = [{} for _ in LAYER_NAMES] # Per layer: cell index -> [(position, rect, collider, motion), ...]
+        self.reach = [1] * len(LAYER_NAMES) # Per layer: cells its colliders may extend to the right and down
+        self.areas = [None] * len(LAYER_NAMES) # Per area layer: (colliders, areas) as given to add_areas()
+        self.orbits = [None] * len(LAYER_NAMES) # Per orbit layer: (colliders, rects, center x, center y, inner, outer)
+        # Running counters for reporting: seconds and contacts per (first layer, second layer), frames run
+        self.broadphase_time = 0.0
+        self.pair_times = {(first, second): 0.0 for first, second, handler in COLLISION_MATRIX}
+        self.pair_contacts = dict.fromkeys(self.pair_times, 0)
+        self.frames = 0
+
+    def clear(self):
+        for cells in self.layers:
+            cells.clear()
+        self.reach = [1] * len(LAYER_NAMES) # Hitboxes without motion fit in one cell
+        self.areas = [None] * len(LAYER_NAMES)
+        self.orbits = [None] * len(LAYER_NAMES)
+
+    def add(self, layer, colliders, rects, motions=None):
+        # File colliders (any objects, e.g. bullet indices) with their (x, y, w, h) rects under layer.
+        # With motions, each rect is where its collider ended a step of (dx, dy) and is swept over it
+        start = time.perf_counter()
+        if motions is None:
+            motions = itertools.repeat(None)
+        else:
+            motions = list(motions)
+            rects = [(x - max(dx, 0), y - max(dy, 0), w + abs(dx), h + abs(dy))
+                     for (x, y, w, h), (dx, dy) in zip(rects, motions)]
+            extent = max((max(w, h) for x, y, w, h in rects), default=0)
+            self.reach[layer] = max(1, math.ceil(extent / self.cell_size))
+        cells = self.layers[layer]
+        margin = self.margin
+        size = self.cell_size
+        last_col = self.cols - 1
+        last_row = self.rows - 1
+        cols = self.cols
+        position = 0
+        for collider, rect, motion in zip(colliders, rects, motions):
+            col = int((rect[0] + margin) // size)
+            row = int((rect[1] + margin) // size)
+            # Positions beyond the grid are clamped into the border cells
+            if col < 0:
+                col = 0
+            elif col > last_col:
+                col = last_col
+            if row < 0:
+                row = 0
+            elif row > last_row:
+                row = last_row
+            index = row * cols + col
+            if index in cells:
+                cells[index].append((position, rect, collider, motion))
+            else:
+                cells[index] = [(position, rect, collider, motion)]
+            position += 1
+        self.broadphase_time += time.perf_counter() - start
+
+    def add_areas(self, layer, colliders, areas):
+        # File area colliders (explosions, auras) of any size: each area is a rect (x, y, w, h) or a
+        # circle (cx, cy, radius). As a first layer they are matched exactly with query(); as a
+        # second layer, by their bounding rects
+        colliders = list(colliders)
+        areas = list(areas)
+        bounds = [area if len(area) == 4 else (area[0] - area[2], area[1] - area[2], area[2] * 2, area[2] * 2)
+                  for area in areas]
+        extent = max((max(w, h) for x, y, w, h in bounds), default=0)
+        self.reach[layer] = max(1, math.ceil(extent / self.cell_size))
+        self.areas[layer] = (colliders, areas)
+        self.add(layer, colliders, bounds)
+
+    def add_orbit(self, layer, colliders, rects, center_x, center_y):
+        # File colliders circling (center_x, center_y), e.g. satellites around the player. As a first
+        # layer they are matched against the second layer's colliders near the annulus their rects
+        # sweep (see orbit_contacts), so each extra collider on the orbit only costs a pass over that band
+        colliders = list(colliders)
+        rects = list(rects)
+        inner = math.inf
+        outer = 0.0
+        for x, y, w, h in rects:
+            distance = math.hypot(x + w / 2 - center_x, y + h / 2 - center_y)
+            half_diagonal = math.hypot(w, h) / 2
+            inner = min(inner, distance - half_diagonal)
+            outer = max(outer, distance + half_diagonal)
+        self.orbits[layer] = (colliders, rects, center_x, center_y, inner, outer)
+        self.add(layer, colliders, rects)
+
+    def query(self, layer, areas):
+        # AoE query: the colliders of layer overlapping each area (rect or circle, as in add_areas),
+        # one list per area in layer order. Every area is matched in the same pass over the cells
+        # they cover, so several explosions cost about as much as their total area
+        return [[collider for position, rect, collider in hits] for hits in self.query_entries(layer, areas)]
+
+    def query_entries(self, layer, areas):
+        # query(), with each collider as (position in layer, rect, collider)
+        cells = self.layers[layer]
+        found = [[] for _ in areas]
+        if not cells:
+            return found
+        margin = self.margin
+        size = self.cell_size
+        cols = self.cols
+        reach = self.reach[layer] # Colliders filed this many cells up/left can still reach in
+        covering = {} # Cell index -> indices of the areas covering it
+        for number, area in enumerate(areas):
+            if len(area) == 4:
+                x, y, w, h = area
+            else:
+                x, y, w, h = area[0] - area[2], area[1] - area[2], area[2] * 2, area[2] * 2
+            col0 = max(0, int((x + margin) // size) - reach)
+            row0 = max(0, int((y + margin) // size) - reach)
+            col1 = min(int((x + w + margin) // size), cols - 1)
+            row1 = min(int((y + h + margin) // size), self.rows - 1)
+            for row in range(row0, row1 + 1):
+                base = row * cols
+                for col in range(col0, col1 + 1):
+                    if base + col in cells:
+                        covering.setdefault(base + col, []).append(number)
+        for index, numbers in covering.items():
+            entries = cells[index]
+            for number in numbers:
+                area = areas[number]
+                if len(area) == 4:
+                    x, y, w, h = area
+                    right = x + w
+                    bottom = y + h
+                    found[number] += [(position, (ox, oy, ow, oh), collider)
+                                      for position, (ox, oy, ow, oh), collider, motion in entries
+                                      if x < ox + ow and right > ox and y < oy + oh and bottom > oy]
+                else: # Circle: bounding square first, then the distance from its center to the nearest point
+                    cx, cy, radius = area
+                    left = cx - radius
+                    top = cy - radius
+                    right = cx + radius
+                    bottom = cy + radius
+                    squared = radius * radius
+                    found[number] += [(position, (ox, oy, ow, oh), collider)
+                                      for position, (ox, oy, ow, oh), collider, motion in entries
+                                      if left < ox + ow and right > ox and top < oy + oh and bottom > oy and
+                                      (cx - (ox if cx < ox else ox + ow if cx > ox + ow else cx)) ** 2
+                                      + (cy - (oy if cy < oy else oy + oh if cy > oy + oh else cy)) ** 2 < squared]
+        for hits in found:
+            hits.sort(key=operator.itemgetter(0))
+        return found
+
+    def contacts(self, first, second):
+        # Overlapping (first layer collider, second layer collider) pairs, in layer order
+        first_cells = self.layers[first]
+        second_cells = self.layers[second]
+        found = []
+        if not first_cells or not second_cells:
+            return found
+        if self.areas[first] is not None:
+            colliders, areas = self.areas[first]
+            return [(collider, other) for collider, others in zip(colliders, self.query(second, areas)) for other in others]
+        if self.orbits[first] is not None:
+            return self.orbit_contacts(first, second)
+        cols = self.cols
+        # Second layer colliders filed up to its reach to the left/up can still overlap, and so can
+        # those up to the first layer's reach to the right/down
+        before = self.reach[second]
+        after = self.reach[first]
+        for index, entries in first_cells.items():
+            row, col = divmod(index, cols)
+            block = []
+            for r in range(max(0, row - before), min(row + after + 1, self.rows)):
+                base = r * cols
+                for c in range(max(0, col - before), min(col + after + 1, cols)):
+                    if base + c in second_cells:
+                        block += second_cells[base + c]
+            if not block:
+                continue
+            for position, box, collider, motion in entries:
+                x, y, w, h = box
+                right = x + w
+                bottom = y + h
+                for other_position, other_box, other, other_motion in block:
+                    ox, oy, ow, oh = other_box
+                    if x < ox + ow and right > ox and y < oy + oh and bottom > oy:
+                        if motion is None and other_motion is None:
+                            found.append((position, 0.0, other_position, collider, other))
+                        else: # Swept bounds overlap; check the paths
+                            t = swept_contact(box, motion, other_box, other_motion)
+                            if t is not None:
+                                found.append((position, t, other_position, collider, other))
+        found.sort(key=lambda contact: contact[:3])
+        return [(collider, other) for position, t, other_position, collider, other in found]
+
+    def orbit_contacts(self, first, second):
+        # contacts() for an orbit layer: the second layer's colliders whose centers are close enough to
+        # the annulus to reach into it are gathered once, and every orbiting collider is tested on them
+        colliders, rects, center_x, center_y, inner, outer = self.orbits[first]
+        cells = self.layers[second]
+        margin = self.margin
+        size = self.cell_size
+        cols = self.cols
+        reach = self.reach[second]
+        block = []
+        for row in range(max(0, int((center_y - outer + margin) // size) - reach),
+                         min(int((center_y + outer + margin) // size), self.rows - 1) + 1):
+            base = row * cols
+            for col in range(max(0, int((center_x - outer + margin) // size) - reach),
+                             min(int((center_x + outer + margin) // size), cols - 1) + 1):
+                if base + col in cells:
+                    block += cells[base + col]
+        # Keep the ones whose centers are close enough to reach into the annulus. Squared distances
+        # are taken between doubled coordinates (2 x center = 2 x left + width); a collider spans at
+        # most reach cells, so it lies within half_diagonal of its center
+        max_width = reach * size
+        half_diagonal = max_width * math.sqrt(0.5)
+        near = 4 * max(0.0, inner - half_diagonal) ** 2
+        far = 4 * (outer + half_diagonal) ** 2
+        center_x *= 2
+        center_y *= 2
+        band = sorted((ox, ox + ow, oy, oy + oh, position, other) for position, (ox, oy, ow, oh), other, motion in block
+                      if near <= (2 * ox + ow - center_x) ** 2 + (2 * oy + oh - center_y) ** 2 < far)
+        lefts = [entry[0] for entry in band]
+        found = []
+        for collider, (x, y, w, h) in zip(colliders, rects):
+            # Only the slice of the band (sorted by left edge) that can reach [x, x + w) is tested
+            right = x + w
+            bottom = y + h
+            hits = [(position, other)
+                    for left, other_right, top, other_bottom, position, other
+                    in band[bisect.bisect_right(lefts, x - max_width):bisect.bisect_left(lefts, right)]
+                    if x < other_right and y < other_bottom and bottom > top]
+            hits.sort(key=operator.itemgetter(0)) # Back into layer order
+            found += [(collider, other) for position, other in hits]
+        return found
+
+    def run(self, handlers):
+        # Hand each layer pair's contacts to getattr(handlers, name), in COLLISION_MATRIX order
+        for first, second, name in COLLISION_MATRIX:
+            start = time.perf_counter()
+            contacts = self.contacts(first, second)
+            if contacts:
+                getattr(handlers, name)(contacts)
+                self.pair_contacts[first, second] += len(contacts)
+            self.pair_times[first, second] += time.perf_counter() - start
+        self.frames += 1
 
 # --- Attack Class ---
 class Attack:
+    width = 8
+    height = 8
+    duration = 10 # Basic attack display duration
+    __slots__ = (
+        "facing_right", "life", "initial_delay", "dead", "relative_offset_x",
+        "relative_offset_y", "image_offset_x", "image_offset_y", "display_x", "display_y"
+    )
+
     # player_x, player_y are player position when attack is generated
     # initial_x_offset, initial_y_offset are relative spawn positions from player
-    # initial_delay is delay in frames until attack appears
+    # initial_delay is delay in frames until attack appears (App holds it in the activation queue until then)
     def __init__(self, player_x, player_y, initial_x_offset, initial_y_offset, facing_right, initial_delay=0):
-        self.width = 8
-        self.height = 8
         self.facing_right = facing_right
-        self.duration = 10 # Basic attack display duration
         self.life = self.duration # Remaining attack lifespan
         self.initial_delay = initial_delay # Initial delay in frames
-        self.spawn_frame = pyxel.frame_count # Frame when attack was spawned
+        self.dead = False # Marked when removed; dropped at the end of the frame
 
         # Remember relative offsets from player
         self.relative_offset_x = initial_x_offset
@@ -574,21 +1182,14 @@ class Attack:
         self.display_y = player_y + self.relative_offset_y + self.image_offset_y
 
     def update(self, player_x, player_y):
-        # Don't decrease life during delay period
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay:
-            # Follow player even during delay period
-            self.display_x = player_x + self.relative_offset_x + self.image_offset_x
-            self.display_y = player_y + self.relative_offset_y + self.image_offset_y
-            return
-
         self.life -= 1
         # Update display position based on player's current position and relative offset
         self.display_x = player_x + self.relative_offset_x + self.image_offset_x
         self.display_y = player_y + self.relative_offset_y + self.image_offset_y
 
     def draw(self):
-        # Don't draw during delay period or if life is exhausted
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay or self.life <= 0:
+        # Don't draw if life is exhausted
+        if self.life <= 0:
             return
 
         if self.facing_right:
@@ -597,75 +1198,178 @@ class Attack:
             pyxel.blt(int(self.display_x), int(self.display_y) ,0, 24, 0, -self.width, self.height, 0)
 
     def is_alive(self):
-        # Consider "alive" even during delay period, "dead" when life is exhausted
-        return self.life > 0 or pyxel.frame_count < self.spawn_frame + self.initial_delay
-
-    def check_collision(self, enemy):
-        # Don't perform collision detection during delay period
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay:
-            return False
-
-        attack_left = self.display_x
-        attack_right = self.display_x + self.width
-        attack_top = self.display_y
-        attack_bottom = self.display_y + self.height
-
-        enemy_left = enemy.x
-        enemy_right = enemy.x + enemy.size
-        enemy_top = enemy.y
-        enemy_bottom = enemy.y + enemy.size
+        return self.life > 0
 
-        return (attack_left < enemy_right and
-                attack_right > enemy_left and
-                attack_top < enemy_bottom and
-                attack_bottom > enemy_top)
+    def get_rect(self):
+        # Return rectangle for collision detection
+        return (self.display_x, self.display_y, self.width, self.height)
+
+# --- ExperienceOrbField Class ---
+class ExperienceOrbField:
+    # All EXP orbs as parallel coordinate/value lists; attraction, pickup and clearing
+    # are each one pass over the lists instead of a method call per orb object
+    radius = 1 # Visual radius of yellow dot remains 1
+    big_radius = 2 # Visual radius of orbs worth ORB_BIG_VALUE or more
+    collision_radius = 4 # Set larger radius for collision detection
+    color = pyxel.COLOR_YELLOW # Set color to yellow
+    attraction_speed = 0.5 # Attraction speed (orb's inherent speed)
+    merge_radius = ORB_MERGE_RADIUS
 
-# --- ExperienceOrb Class ---
-class ExperienceOrb:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.radius = 1 # Visual radius of yellow dot remains 1
-        self.collision_radius = 4 # Set larger radius for collision detection
-        self.color = pyxel.COLOR_YELLOW # Set color to yellow
-        self.value = 1 # Amount of experience (placeholder)
-        self.attraction_speed = 0.5 # Attraction speed (orb's inherent speed)
-
-    def update(self, player_x, player_y, player_attraction_range): # Add player coordinates and attraction range as arguments
-        # Calculate distance to player
-        dx = player_x - self.x
-        dy = player_y - self.y
-        dist = math.sqrt(dx * dx + dy * dy)
-
-        # If player is within attraction range, move orb towards player
-        if dist < player_attraction_range and dist != 0:
-            self.x += dx / dist * self.attraction_speed
-            self.y += dy / dist * self.attraction_speed
+    def __init__(self):
+        self.xs = []
+        self.ys = []
+        self.values = [] # Amount of experience per orb
+
+    def add(self, x, y, value=1):
+        self.xs.append(x)
+        self.ys.append(y)
+        self.values.append(value)
+
+    def evict_cheapest(self, count):
+        # Drop up to count orbs, lowest value first (oldest first among equals); returns how many were dropped
+        count = min(count, len(self.xs))
+        if count:
+            keep = [True] * len(self.xs)
+            for i in sorted(range(len(self.values)), key=self.values.__getitem__)[:count]:
+                keep[i] = False
+            self.xs = list(itertools.compress(self.xs, keep))
+            self.ys = list(itertools.compress(self.ys, keep))
+            self.values = list(itertools.compress(self.values, keep))
+        return count
+
+    def add_many(self, xs, ys, value=1):
+        # A batch of orbs (the kills of one frame), coalesced among themselves first
+        xs, ys, values = self.merged(xs, ys, [value] * len(xs))
+        self.xs.extend(xs)
+        self.ys.extend(ys)
+        self.values.extend(values)
+
+    def coalesce(self):
+        # Merge every orb within merge_radius of an older one into it
+        self.xs, self.ys, self.values = self.merged(self.xs, self.ys, self.values)
+
+    def merged(self, xs, ys, values):
+        # Coalesce in order: each orb adds its value to the first kept orb within merge_radius
+        # (looked up in a dict of merge_radius px cells, 3x3 around it) or is kept itself
+        r = self.merge_radius
+        if not r or len(xs) < 2:
+            return xs, ys, values
+        r_sq = r * r
+        cells = {} # (col, row) -> indices of kept orbs
+        keep_xs, keep_ys, keep_values = [], [], []
+        for x, y, value in zip(xs, ys, values):
+            col = int(x // r)
+            row = int(y // r)
+            target = None
+            for key in ((col, row), (col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1),
+                        (col - 1, row - 1), (col + 1, row - 1), (col - 1, row + 1), (col + 1, row + 1)):
+                for k in cells.get(key, ()):
+                    dx = keep_xs[k] - x
+                    dy = keep_ys[k] - y
+                    if dx * dx + dy * dy < r_sq:
+                        target = k
+                        break
+                if target is not None:
+                    break
+            if target is None:
+                cells.setdefault((col, row), []).append(len(keep_xs))
+                keep_xs.append(x)
+                keep_ys.append(y)
+                keep_values.append(value)
+            else:
+                keep_values[target] += value
+        return keep_xs, keep_ys, keep_values
+
+    def clear(self):
+        self.xs = []
+        self.ys = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.xs)
+
+    def attract(self, player_x, player_y, player_attraction_range):
+        # Orbs within attraction range move towards the player (squared distance skips sqrt for the rest)
+        xs = self.xs
+        ys = self.ys
+        speed = self.attraction_speed
+        range_sq = player_attraction_range * player_attraction_range
+        for i in range(len(xs)):
+            dx = player_x - xs[i]
+            dy = player_y - ys[i]
+            dist_sq = dx * dx + dy * dy
+            if 0 < dist_sq < range_sq:
+                step = speed / math.sqrt(dist_sq)
+                xs[i] += dx * step
+                ys[i] += dy * step
+
+    def collect(self, rect):
+        # Remove orbs whose collision rectangle overlaps rect; returns the total value collected
+        x, y, w, h = rect
+        r = self.collision_radius
+        left, right, top, bottom = x - r, x + w + r, y - r, y + h + r
+        keep_xs, keep_ys, keep_values = [], [], []
+        collected = 0
+        for ox, oy, value in zip(self.xs, self.ys, self.values):
+            if left < ox < right and top < oy < bottom:
+                collected += value
+            else:
+                keep_xs.append(ox)
+                keep_ys.append(oy)
+                keep_values.append(value)
+        self.xs, self.ys, self.values = keep_xs, keep_ys, keep_values
+        return collected
+
+    def clear_in_rects(self, rects):
+        # Remove orbs whose center is strictly inside any of rects
+        if not rects or not self.xs:
+            return
+        bounds = [(rx, ry, rx + rw, ry + rh) for rx, ry, rw, rh in rects]
+        keep_xs, keep_ys, keep_values = [], [], []
+        for ox, oy, value in zip(self.xs, self.ys, self.values):
+            for left, top, right, bottom in bounds:
+                if left < ox < right and top < oy < bottom:
+                    break
+            else:
+                keep_xs.append(ox)
+                keep_ys.append(oy)
+                keep_values.append(value)
+        self.xs, self.ys, self.values = keep_xs, keep_ys, keep_values
 
     def draw(self):
-        pyxel.circ(self.x, self.y, self.radius, self.color) # Use visual radius
+        for x, y, value in zip(self.xs, self.ys, self.values):
+            pyxel.circ(x, y, self.big_radius if value >= ORB_BIG_VALUE else self.radius, self.color) # Use visual radius
 
-    def get_rect(self):
-        # Return rectangle for collision detection (generate rectangle based on collision_radius)
-        return (self.x - self.collision_radius, self.y - self.collision_radius, self.collision_radius * 2, self.collision_radius * 2)
+    def memory_size(self):
+        # Bytes held by the three lists and the numbers in them
+        seen = set()
+        size = sys.getsizeof(self.xs) + sys.getsizeof(self.ys) + sys.getsizeof(self.values)
+        for values in (self.xs, self.ys, self.values):
+            size += sum(owned_size(value, seen) for value in values)
+        return size
 
 # --- Satellite Class (New) ---
 class Satellite:
+    size = 8 # Satellite drawing size and collision size to 8x8 to match image
+    __slots__ = ("radius", "rotation_speed", "angle", "display_x", "display_y")
+
     def __init__(self, player_x, player_y, radius, rotation_speed):
         self.radius = radius # Rotation radius from player
         self.rotation_speed = rotation_speed # Rotation speed (degrees/frame)
         self.angle = random.uniform(0, 360) # Set initial angle randomly
-        self.size = 8 # Satellite drawing size and collision size to 8x8 to match image
 
-        # Drawing position (updated every frame in update)
+        # Drawing position (updated every frame in update_all)
         self.display_x = 0
         self.display_y = 0
 
-    def update(self, player_x, player_y):
-        self.angle = (self.angle + self.rotation_speed) % 360
-        # Calculate orbit from player's center + specified offset (center is 4px because image size is 8x8)
-        self.display_x = player_x + self.radius * math.cos(math.radians(self.angle)) + 4
-        self.display_y = player_y + self.radius * math.sin(math.radians(self.angle)) + 4
+    @classmethod
+    def update_all(cls, satellites, player_x, player_y):
+        # Advance every satellite along its orbit around the player's center (4px in, the image is 8x8)
+        for satellite in satellites:
+            satellite.angle = (satellite.angle + satellite.rotation_speed) % 360
+            radians = math.radians(satellite.angle)
+            satellite.display_x = player_x + satellite.radius * math.cos(radians) + 4
+            satellite.display_y = player_y + satellite.radius * math.sin(radians) + 4
 
     def draw(self):
         # Draw satellite with specified image (adjust blt XY so center is display_x, display_y)
@@ -677,17 +1381,27 @@ class Satellite:
 
 # --- Bullet Class (New) ---
 class Bullet:
-    def __init__(self, x, y, target_x, target_y, speed=2, size=8, initial_delay=0, is_enemy_bullet=False, damage=1, drops_exp=True): # Add damage and drops_exp
+    __slots__ = (
+        "x", "y", "size", "speed", "life", "initial_delay", "damage", "drops_exp", "dead",
+        "vx", "vy", "last_x", "last_y"
+    )
+
+    def __init__(self, x, y, target_x, target_y, speed=2, size=8, initial_delay=0, damage=1, drops_exp=True): # Add damage and drops_exp
+        self.reset(x, y, target_x, target_y, speed, size, initial_delay, damage, drops_exp)
+
+    def reset(self, x, y, target_x, target_y, speed=2, size=8, initial_delay=0, damage=1, drops_exp=True):
+        # (Re)initialize in place so ProjectilePool can reuse this object
         self.x = x
         self.y = y
+        self.last_x = x # Position before the last update, for swept collision
+        self.last_y = y
         self.size = size # Set to 8 to match image size
         self.speed = speed
         self.life = 120 # Max lifespan (frames)
-        self.initial_delay = initial_delay # Initial delay in frames
-        self.spawn_frame = pyxel.frame_count # Frame when bullet was spawned
-        self.is_enemy_bullet = is_enemy_bullet # Whether it's an enemy bullet
+        self.initial_delay = initial_delay # Initial delay in frames (waits in the activation queue)
         self.damage = damage # Damage this bullet deals
         self.drops_exp = drops_exp # Whether this bullet drops EXP when destroyed by player attacks
+        self.dead = False # Marked when removed; dropped at the end of the frame
 
         # Calculate direction vector to target
         dx = target_x - self.x
@@ -701,41 +1415,27 @@ class Bullet:
             self.vy = 0
 
     def update(self):
-        # Don't move during delay period
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay:
-            return
-
+        self.last_x = self.x
+        self.last_y = self.y
         self.x += self.vx
         self.y += self.vy
         self.life -= 1
 
+    def get_motion(self):
+        # Movement (dx, dy) of the last update; get_rect() minus this is where the bullet started
+        return (self.x - self.last_x, self.y - self.last_y)
+
     def draw(self):
-        # Don't draw during delay period or if life is exhausted
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay or self.life <= 0:
+        # Don't draw if life is exhausted
+        if self.life <= 0:
             return
         
-        u_img = 16 # U coordinate for player bullet
-        v_img = 48 # V coordinate for player bullet
-        if self.is_enemy_bullet:
-            if self.damage == 3: # Ultra Shot Ghost bullet
-                u_img = 48 # U coordinate for Ultra Shot Ghost bullet
-                v_img = 8  # V coordinate for Ultra Shot Ghost bullet
-            else: # Normal Shot Ghost bullet
-                u_img = 32 # U coordinate for enemy bullet
-                v_img = 8  # V coordinate for enemy bullet
-            # Enemy bullet is 4x4, so adjust blt size (but draw central 4x4 of 8x8 image)
-            pyxel.blt(int(self.x - 2), int(self.y - 2), 0, u_img, v_img, 4, 4, 0)
-        else:
-            # Draw bullet with specified image (adjust blt XY so center is x, y)
-            pyxel.blt(int(self.x - self.size / 2), int(self.y - self.size / 2), 0, u_img, v_img, self.size, self.size, 0)
-
+        # Draw bullet with specified image (adjust blt XY so center is x, y)
+        pyxel.blt(int(self.x - self.size / 2), int(self.y - self.size / 2), 0, 16, 48, self.size, self.size, 0)
 
     def get_rect(self):
         # Return rectangle for collision detection (adjusted to image size)
-        if self.is_enemy_bullet:
-            return (self.x - 2, self.y - 2, 4, 4) # Enemy bullet is 4x4
-        else:
-            return (self.x - self.size / 2, self.y - self.size / 2, self.size, self.size)
+        return (self.x - self.size / 2, self.y - self.size / 2, self.size, self.size)
 
     def is_alive(self):
         # Whether it's off screen or life is exhausted
@@ -743,77 +1443,190 @@ class Bullet:
                          self.y < -self.size or self.y > SCREEN_HEIGHT + self.size)
         return self.life > 0 and not is_off_screen
 
+# --- EnemyBulletField Class (New) ---
+class EnemyBulletField:
+    # All enemy bullets as parallel lists, like ExperienceOrbField: a BulletPattern volley is appended
+    # a whole column at a time, and motion and off-screen checks are one pass per column.
+    # Bullets are kept in spawn order, so the ones out of life are always a prefix found by bisect
+    size = 4 # Enemy bullets are 4x4, centered on (x, y)
+    lifespan = 120 # Max lifespan (frames)
+
+    def __init__(self, capacity, overflow="refuse"):
+        self.capacity = capacity
+        self.overflow = overflow # "drop_oldest" or "refuse", as for ProjectilePool
+        self.frame = 0 # Frames updated, stamps births
+        # Running counters for reporting
+        self.spawned = 0
+        self.dropped = 0
+        self.refused = 0
+        self.clear()
+
+    def clear(self):
+        self.xs = []
+        self.ys = []
+        self.vxs = []
+        self.vys = []
+        self.births = [] # Value of frame when emitted
+        self.damages = []
+        self.drops_exp = []
+        self.sprites = []
+        self.dead = [] # Marked when removed; dropped by compact() at the end of the frame
+
+    def columns(self):
+        return (self.xs, self.ys, self.vxs, self.vys, self.births, self.damages, self.drops_exp, self.sprites, self.dead)
+
+    def emit(self, pattern, origins, target_x, target_y):
+        # Fire pattern from every (x, y) in origins; returns how many bullets were added
+        xs, ys, vxs, vys = pattern.volley(origins, target_x, target_y)
+        count = len(xs)
+        room = self.capacity - len(self.xs)
+        if count > room:
+            if self.overflow == "drop_oldest":
+                drop = min(count - room, len(self.xs))
+                self.dropped += drop - sum(self.dead[:drop])
+                for column in self.columns():
+                    del column[:drop]
+                room += drop
+            if count > room: # Keep the first bullets that fit
+                self.refused += count - room
+                count = room
+                del xs[count:], ys[count:], vxs[count:], vys[count:]
+        self.xs += xs
+        self.ys += ys
+        self.vxs += vxs
+        self.vys += vys
+        self.births += [self.frame] * count
+        self.damages += [pattern.damage] * count
+        self.drops_exp += [pattern.drops_exp] * count
+        self.sprites += [pattern.sprite] * count
+        self.dead += [False] * count
+        self.spawned += count
+        return count
+
+    def update(self):
+        # Move every bullet; those out of life or off screen are marked dead
+        self.frame += 1
+        self.xs = list(map(operator.add, self.xs, self.vxs))
+        self.ys = list(map(operator.add, self.ys, self.vys))
+        size = self.size
+        left, top, right, bottom = -size, -size, SCREEN_WIDTH + size, SCREEN_HEIGHT + size
+        self.dead = [
+            dead or not (left <= x <= right and top <= y <= bottom)
+            for x, y, dead in zip(self.xs, self.ys, self.dead)
+        ]
+        expired = bisect.bisect_right(self.births, self.frame - self.lifespan)
+        if expired:
+            self.dead[:expired] = [True] * expired
+
+    def get_rect(self, i):
+        # Return rectangle for collision detection of bullet i
+        return (self.xs[i] - 2, self.ys[i] - 2, 4, 4)
+
+    def compact(self):
+        # Drop the bullets marked dead from every column
+        if any(self.dead):
+            keep = [not dead for dead in self.dead]
+            (self.xs, self.ys, self.vxs, self.vys, self.births, self.damages, self.drops_exp, self.sprites,
+             self.dead) = (list(itertools.compress(column, keep)) for column in self.columns())
+
+    def __len__(self):
+        return len(self.xs)
+
+    def draw(self):
+        for x, y, (u, v), dead in zip(self.xs, self.ys, self.sprites, self.dead):
+            if not dead:
+                pyxel.blt(int(x - 2), int(y - 2), 0, u, v, 4, 4, 0)
+
+    def memory_size(self):
+        # Bytes held by the columns and the numbers in them (sprites are shared with the patterns)
+        seen = set()
+        size = 0
+        for values in self.columns():
+            size += sys.getsizeof(values)
+            if values is not self.sprites:
+                size += sum(owned_size(value, seen) for value in values)
+        return size
+
 # --- Meteor Class (New) ---
 class Meteor:
-    def __init__(self, start_x, start_y, target_x, target_y, fly_duration, explode_duration, initial_delay=0):
+    image_meteor_u = 16
+    image_meteor_v = 16
+    image_explosion_u = 16
+    image_explosion_v = 32
+    image_width = 16
+    image_height = 16
+    fly_duration = 60 # Frames for flight
+    explode_duration = 120 # Frames for explosion display
+    # FLYING -> EXPLODING -> DONE
+    fsm_spec = dict(
+        durations=(fly_duration, explode_duration, None),
+        next_states=(METEOR_EXPLODING, METEOR_DONE, None)
+    )
+    __slots__ = (
+        "start_x", "start_y", "target_x", "target_y", "initial_delay", "state", "state_tick", "fsm_cohort",
+        "dead", "current_x", "current_y", "current_size", "impact_x", "impact_y"
+    )
+
+    def __init__(self, start_x, start_y, target_x, target_y, initial_delay=0):
         self.start_x = start_x
         self.start_y = start_y
         self.target_x = target_x
         self.target_y = target_y
-        self.fly_duration = fly_duration # Frames for flight
-        self.explode_duration = explode_duration # Frames for explosion display
-        self.spawn_frame = pyxel.frame_count # Frame when spawned
-        self.initial_delay = initial_delay # Initial delay in frames
+        self.initial_delay = initial_delay # Initial delay in frames (waits in the activation queue)
 
-        self.state = "FLYING" # "FLYING", "EXPLODING", "DONE"
-        self.current_frame_in_state = 0 # Elapsed frames in each state
+        self.state = METEOR_FLYING # Joins the state machine when it starts falling (update_all)
+        self.state_tick = 0
+        self.fsm_cohort = None
+        self.dead = False # Marked when removed; dropped at the end of the frame
 
         self.current_x = start_x
         self.current_y = start_y
         self.current_size = 0 # Expand during flight
 
-        self.image_meteor_u = 16
-        self.image_meteor_v = 16
-        self.image_explosion_u = 16
-        self.image_explosion_v = 32
-        self.image_width = 16
-        self.image_height = 16
-
         self.impact_x = 0 # X coordinate at impact
         self.impact_y = 0 # Y coordinate at impact
 
-    def update(self):
-        # Don't update during delay period
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay:
-            return
-
-        self.current_frame_in_state += 1
-
-        if self.state == "FLYING":
-            t = self.current_frame_in_state / self.fly_duration
-            if t >= 1.0:
-                self.state = "EXPLODING"
-                self.current_frame_in_state = 0
-                self.impact_x = self.target_x
-                self.impact_y = self.target_y
-                pyxel.play(0, 4) # Play meteor impact sound
-            else:
-                # Calculate position with linear interpolation
-                self.current_x = self.start_x + (self.target_x - self.start_x) * t
-                # Fix: Interpolate target_y correctly
-                self.current_y = self.start_y + (self.target_y - self.start_y) * t # Corrected line
+    @classmethod
+    def update_all(cls, meteors, fsm):
+        # Meteors released from the activation queue since the last frame start falling now
+        # (fsm is the game's meteor StateMachine, built from fsm_spec)
+        for meteor in meteors:
+            if meteor.fsm_cohort is None and not meteor.dead:
+                fsm.enter(meteor, METEOR_FLYING)
+
+        for state, elapsed, members in fsm.step():
+            if state == METEOR_FLYING:
+                t = elapsed / cls.fly_duration
                 # Expand size (e.g., from 0 to image_width)
-                self.current_size = int(self.image_width * t)
-                if self.current_size < 1: self.current_size = 1 # Ensure minimum size
-
-        elif self.state == "EXPLODING":
-            # Fix: Use current_frame_in_state instead of current_frame_in_frame
-            if self.current_frame_in_state >= self.explode_duration:
-                self.state = "DONE"
+                size = max(1, int(cls.image_width * t)) # Ensure minimum size
+                for meteor in members:
+                    # Calculate position with linear interpolation
+                    meteor.current_x = meteor.start_x + (meteor.target_x - meteor.start_x) * t
+                    meteor.current_y = meteor.start_y + (meteor.target_y - meteor.start_y) * t
+                    meteor.current_size = size
+            elif elapsed == 0:
+                if state == METEOR_EXPLODING: # Just hit the ground
+                    for meteor in members:
+                        meteor.impact_x = meteor.target_x
+                        meteor.impact_y = meteor.target_y
+                    pyxel.play(0, 4) # Play meteor impact sound
+                else: # Explosion over
+                    for meteor in members:
+                        meteor.dead = True
 
     def draw(self):
-        # Don't draw during delay period or if life is exhausted
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay or self.state == "DONE":
+        # Don't draw if life is exhausted
+        if self.state == METEOR_DONE:
             return
 
-        if self.state == "FLYING":
+        if self.state == METEOR_FLYING:
             # Draw meteor (expand based on center)
             draw_x = int(self.current_x - self.current_size / 2)
             draw_y = int(self.current_y - self.current_size / 2)
             pyxel.blt(draw_x, draw_y, 0,
                       self.image_meteor_u, self.image_meteor_v,
                       self.image_width, self.image_height, 0)
-        elif self.state == "EXPLODING":
+        elif self.state == METEOR_EXPLODING:
             # Draw explosion
             draw_x = int(self.impact_x - self.image_width / 2)
             draw_y = int(self.impact_y - self.image_height / 2)
@@ -822,11 +1635,10 @@ class Meteor:
                       self.image_width, self.image_height, 0)
 
     def is_alive(self):
-        # Consider "alive" even during delay period
-        return self.state != "DONE" or pyxel.frame_count < self.spawn_frame + self.initial_delay
+        return self.state != METEOR_DONE
 
     def get_explosion_rect(self):
-        if self.state == "EXPLODING":
+        if self.state == METEOR_EXPLODING:
             # Collision detection range for explosion (use explosion image size)
             return (self.impact_x - self.image_width / 2,
                     self.impact_y - self.image_height / 2,
@@ -836,16 +1648,27 @@ class Meteor:
 
 # --- Cutter Class (New Skill) ---
 class Cutter:
+    size = 8 # Cutter image size
+    __slots__ = (
+        "x", "y", "speed", "reflections_left", "damage", "initial_delay", "life", "dead",
+        "angle_radians", "vx", "vy", "last_x", "last_y"
+    )
+
     def __init__(self, x, y, angle_degrees, speed, reflections_left, damage, initial_delay=0):
+        self.reset(x, y, angle_degrees, speed, reflections_left, damage, initial_delay)
+
+    def reset(self, x, y, angle_degrees, speed, reflections_left, damage, initial_delay=0):
+        # (Re)initialize in place so ProjectilePool can reuse this object
         self.x = x
         self.y = y
-        self.size = 8 # Cutter image size
+        self.last_x = x # Position before the last update, for swept collision
+        self.last_y = y
         self.speed = speed
         self.reflections_left = reflections_left
         self.damage = damage
-        self.initial_delay = initial_delay
-        self.spawn_frame = pyxel.frame_count
+        self.initial_delay = initial_delay # Waits in the activation queue
         self.life = 5 * 30 # Cutter lifespan (5 seconds * 30 FPS) - Changed from 3 seconds
+        self.dead = False # Marked when removed; dropped at the end of the frame
 
         # Convert angle to radians for movement
         self.angle_radians = math.radians(angle_degrees)
@@ -853,9 +1676,8 @@ class Cutter:
         self.vy = self.speed * math.sin(self.angle_radians)
 
     def update(self):
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay:
-            return
-
+        self.last_x = self.x
+        self.last_y = self.y
         self.x += self.vx
         self.y += self.vy
         self.life -= 1 # Decrement life each frame
@@ -879,7 +1701,7 @@ class Cutter:
         # The `is_alive` method will handle its disappearance based on `self.life`.
             
     def draw(self):
-        if pyxel.frame_count < self.spawn_frame + self.initial_delay or not self.is_alive():
+        if not self.is_alive():
             return
         pyxel.blt(int(self.x), int(self.y), 0, 16, 56, self.size, self.size, 0)
 
@@ -891,6 +1713,166 @@ class Cutter:
     def get_rect(self):
         return (self.x, self.y, self.size, self.size)
 
+    def get_motion(self):
+        # Movement (dx, dy) of the last update, after any reflection (swept as a straight line)
+        return (self.x - self.last_x, self.y - self.last_y)
+
+# --- ProjectilePool Class ---
+class ProjectilePool:
+    # Fixed set of preallocated player Bullet or Cutter objects; spawn() reinitializes one from the free list
+    # and compact() returns dead ones to it, so heavy bullet phases allocate nothing
+    def __init__(self, factory, capacity, overflow="drop_oldest"):
+        self.capacity = capacity
+        self.overflow = overflow # "drop_oldest" or "refuse"
+        self.free = [factory() for _ in range(capacity)]
+        self.active = [] # Live projectiles in spawn order (dead ones stay until compact())
+        for item in self.free:
+            item.dead = True
+        # Running counters for reporting (allocations only happen at construction)
+        self.allocations = capacity
+        self.spawned = 0
+        self.dropped = 0
+        self.refused = 0
+
+    def take(self, *args, **kwargs):
+        # Reinitialize a free (or recycled) projectile without making it live; pass it to append()
+        if self.free:
+            item = self.free.pop()
+        elif self.overflow == "drop_oldest" and self.active:
+            item = self.active.pop(0)
+            if not item.dead:
+                self.dropped += 1
+        else:
+            self.refused += 1
+            return None
+        item.reset(*args, **kwargs)
+        self.spawned += 1
+        return item
+
+    def append(self, item):
+        # Make a projectile from take() live
+        self.active.append(item)
+
+    def spawn(self, *args, **kwargs):
+        item = self.take(*args, **kwargs)
+        if item is not None:
+            self.append(item)
+        return item
+
+    def compact(self):
+        # Move dead projectiles back to the free list
+        if any(item.dead for item in self.active):
+            self.free.extend(item for item in self.active if item.dead)
+            self.active = [item for item in self.active if not item.dead]
+
+    def clear(self):
+        for item in self.active:
+            item.dead = True
+        self.free.extend(self.active)
+        self.active = []
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __len__(self):
+        return len(self.active)
+
+# --- ActivationQueue Class (New) ---
+class ActivationQueue:
+    """
+    Timer wheel for weapons spawned with an initial delay. Each pending item waits in the bucket
+    for its activation frame and is appended to its collection when release() reaches that frame,
+    so live collections only ever hold active weapons.
+    """
+    def __init__(self, frame):
+        self.buckets = {} # Activation frame -> [(collection, item), ...]
+        self.cursor = frame # Last frame released
+
+    def schedule(self, frame, collection, item):
+        self.buckets.setdefault(frame, []).append((collection, item))
+
+    def release(self, frame):
+        # Walk every frame since the last call (frames keep counting while the level up menu is open)
+        if self.buckets:
+            for due in range(self.cursor + 1, frame + 1):
+                for collection, item in self.buckets.pop(due, ()):
+                    collection.append(item)
+        self.cursor = frame
+
+    def flush(self):
+        # Activate everything still pending (before clearing the collections)
+        for frame in sorted(self.buckets):
+            for collection, item in self.buckets[frame]:
+                collection.append(item)
+        self.buckets.clear()
+
+    def __iter__(self):
+        for bucket in self.buckets.values():
+            for collection, item in bucket:
+                yield item
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+
+# --- Spawn Schedule (New) ---
+def playing_spawn_curve(frame):
+    # Difficulty of the timed game at game_elapsed_frames == frame:
+    # (spawn types, type weights, ghosts per wave, spawn interval)
+    if frame < 30 * 30: # First 30 seconds
+        spawn_types = ("normal",)
+    elif frame < 60 * 30: # 30 seconds to 60 seconds (up to 1 minute total)
+        spawn_types = ("normal", "shot")
+    else: # 60 seconds onwards
+        spawn_types = ("normal", "shot", "shield")
+    # Spawn amount grows 1.5x every minute after the first
+    return spawn_types, (1,) * len(spawn_types), int(1.5 ** (frame // (60 * 30))), ENEMY_SPAWN_INTERVAL
+
+def endless_spawn_curve(frame):
+    # Difficulty in endless mode, frame counted from its start: every ghost type (ultra shot included),
+    # 2^elapsed minutes ghosts per wave
+    spawn_types = ("normal", "shot", "shield", "super_shield", "ultra_shot", "big_normal")
+    return spawn_types, (1,) * len(spawn_types), max(1, 2 ** (frame // (60 * 30))), ENEMY_SPAWN_INTERVAL
+
+class SpawnSchedule:
+    """
+    Difficulty curve as a table indexed by frame // SPAWN_SCHEDULE_STEP. Each row is
+    (spawn types, type weights, ghosts per wave, spawn interval); past the end the last row holds.
+    Built once per game by compile_spawn_schedule, so a spawn tick costs one lookup and another
+    curve can be swapped in without touching App.update.
+    """
+    __slots__ = ("rows",)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def lookup(self, frame):
+        index = frame // SPAWN_SCHEDULE_STEP
+        return self.rows[index] if index < len(self.rows) else self.rows[-1]
+
+def compile_spawn_schedule(curve, frames):
+    # Evaluate curve(frame) at every step from 0 to frames
+    return SpawnSchedule([curve(frame) for frame in range(0, frames + 1, SPAWN_SCHEDULE_STEP)])
+
+# --- Memory Report (New) ---
+def owned_size(value, seen):
+    # Bytes of a value owned by one entity; small ints, bools, None and strings are shared objects
+    if id(value) in seen:
+        return 0
+    if isinstance(value, float) or (isinstance(value, int) and not isinstance(value, bool) and not -5 <= value <= 256):
+        seen.add(id(value))
+        return sys.getsizeof(value)
+    if isinstance(value, tuple):
+        seen.add(id(value))
+        return sys.getsizeof(value) + sum(owned_size(item, seen) for item in value)
+    return 0
+
+def entity_size(entity):
+    # Instance plus the values in its slots (per-type constants live on the class and cost nothing)
+    seen = set()
+    slots = [slot for cls in type(entity).__mro__ for slot in getattr(cls, "__slots__", ())]
+    return sys.getsizeof(entity) + sum(owned_size(getattr(entity, slot, None), seen) for slot in slots)
+
 
 # --- App Class ---
 class App:
@@ -956,22 +1938,20 @@ class App:
         self.facing_right = True
         self.step_interval = 4
         self.step_timer = 0
-        self.enemies = [] # Normal enemies
-        self.shot_ghosts = [] # List of Shot Ghosts
-        self.shield_ghosts = [] # List of Shield Ghosts
-        self.super_shield_ghosts = [] # List of Super Shield Ghosts (New)
-        self.ultra_shot_ghosts = [] # List of Ultra Shot Ghosts (New)
-        self.big_normal_ghosts = [] # List of Big Normal Ghosts (New)
+        self.enemies = EnemyRegistry() # All ghosts of every type, tagged by kind
+        self.collisions = CollisionWorld() # Every collider, refilled each frame by collide()
+        self.crowd_grid = SpatialHash(cell_size=SEPARATION_RADIUS) # Neighbor index for separation_step
         self.enemy_spawn_timer = 0
-        self.base_enemy_spawn_interval = 30 # Base enemy spawn interval
         self.attacks = []
         self.attack_timer = 0
+        self.activation_queue = ActivationQueue(pyxel.frame_count) # Delayed attacks, bullets, meteors and cutters
         self.base_attack_interval = 30 # Base attack interval
         self.attack_interval = self.base_attack_interval # Current attack interval
-        self.experience_orbs = [] # List of experience orbs
-        self.bullets = [] # List of player bullet objects
-        self.enemy_bullets = [] # List of enemy bullet objects
+        self.experience_orbs = ExperienceOrbField() # Every experience orb, as coordinate lists
+        self.bullets = ProjectilePool(lambda: Bullet(0, 0, 0, 0), PLAYER_BULLET_POOL_SIZE, PLAYER_BULLET_OVERFLOW) # Player bullet objects
+        self.enemy_bullets = EnemyBulletField(ENEMY_BULLET_CAPACITY, ENEMY_BULLET_OVERFLOW) # Enemy bullets as parallel lists
         self.meteors = [] # List of meteor objects
+        self.meteor_fsm = StateMachine(**Meteor.fsm_spec) # Flight/explosion timing of every meteor
 
         self.hp = 20 # Set initial HP to 20
         self.max_hp = 20 # Set max HP to 20
@@ -983,6 +1963,7 @@ class App:
         self.player_blink_interval = 5
 
         self.kill_count = 0
+        self.hit_events = [] # (ghost, projectile, play_sound, area) hits recorded by weapon passes this frame
         self.exp = 0 # Add experience variable
         self.current_level = 1 # Current level
         self.exp_to_next_level = 3 # Set experience needed for next level up to 3
@@ -1017,7 +1998,7 @@ class App:
         self.meteors_per_strike = 0 # Number of meteors falling per strike
 
         # Cutter Skill variables (New)
-        self.cutters = []
+        self.cutters = ProjectilePool(lambda: Cutter(0, 0, 0, 0, 0, 0), CUTTER_POOL_SIZE, CUTTER_OVERFLOW)
         self.can_spawn_cutter = False
         self.cutters_per_shot = 0 # Number of cutters fired at once
         self.cutter_spawn_timer = 0
@@ -1045,9 +2026,11 @@ class App:
         self.alert_display_timer = 0
         self.alert_display_duration = 30 # Announcement display duration (1.0 seconds = 30 frames)
 
-        # Enemy difficulty increase
-        self.enemies_per_spawn = 1 # Number of enemies spawned per spawn
-        self.next_difficulty_increase_time_for_spawn_amount = 60 * 30 # First spawn amount increase after 1 minute (30FPS)
+        # Enemy difficulty increase, compiled into spawn schedule tables
+        self.spawn_schedule = compile_spawn_schedule(playing_spawn_curve, self.game_duration_frames)
+        self.endless_spawn_schedule = compile_spawn_schedule(endless_spawn_curve, ENDLESS_SCHEDULE_FRAMES)
+        self.deferred_spawns = 0 # Endless mode ghosts held back by the entity budget
+        self.evicted_count = 0 # Orbs and ghosts removed to make room under the entity budget
 
         # For skill selection menu (list of all skills)
         self.all_skill_options = [
@@ -1109,7 +2092,7 @@ class App:
         # if self.bullets_per_shot == 0: self.bullets_per_shot = 1 # Removed bullet skill from cheat mode
 
         # Apply enemy spawn rate equivalent to 2 minutes in endless mode
-        self.enemies_per_spawn = max(1, int(2 ** 2))
+        self.endless_spawn_schedule = SpawnSchedule([endless_spawn_curve(2 * 60 * 30)])
 
 
     def update(self):
@@ -1128,18 +2111,15 @@ class App:
             self.game_state = "GAME_CLEAR"
             self.endless_mode_start_time = pyxel.frame_count # Record time of game clear
             # Clear all enemies and bullets when game is cleared
-            self.enemies = []
-            self.shot_ghosts = []
-            self.shield_ghosts = []
-            self.super_shield_ghosts = []
-            self.ultra_shot_ghosts = [] # Clear ultra shot ghosts (New)
-            self.big_normal_ghosts = [] # Clear big normal ghosts (New)
-            self.enemy_bullets = []
-            self.bullets = []
-            self.attacks = []
+            self.enemies.clear()
+            self.activation_queue.flush() # Pending weapons join their collections and are cleared with them
+            self.enemy_bullets.clear()
+            self.bullets.clear()
+            self.attacks.clear()
             # self.satellites = []
-            self.meteors = []
-            self.cutters = [] # Clear cutters (New)
+            self.meteors.clear()
+            self.meteor_fsm.clear()
+            self.cutters.clear() # Clear cutters (New)
             return # Stop updating after game clear
 
         # Transition from GAME_CLEAR to ENDLESS_MODE
@@ -1250,221 +2230,53 @@ class App:
                         pyxel.play(0, 0) # Barrier deactivation sound (placeholder)
 
             # --- Enemy Spawning (according to difficulty) ---
+            if self.game_state == "PLAYING":
+                spawn_row = self.spawn_schedule.lookup(self.game_elapsed_frames)
+            else: # Endless mode; the cheat mode schedule holds the rate of minute 2
+                spawn_row = self.endless_spawn_schedule.lookup(pyxel.frame_count - self.endless_mode_start_time)
+            spawn_types, spawn_weights, spawn_count, spawn_interval = spawn_row
             self.enemy_spawn_timer += 1
-            if self.enemy_spawn_timer >= self.base_enemy_spawn_interval:
-                spawn_types = []
-                if self.game_state == "PLAYING":
-                    # 既存のPLAYINGモードのスポーンタイプ
-                    if self.game_elapsed_frames < 30 * 30: # First 30 seconds
-                        spawn_types = ["normal"]
-                    elif self.game_elapsed_frames < 60 * 30: # 30 seconds to 60 seconds (up to 1 minute total)
-                        spawn_types = ["normal", "shot"]
-                    else: # 60 seconds onwards (including 90 seconds and beyond)
-                        spawn_types = ["normal", "shot", "shield"]
-
-
-                    # Increase enemy spawn amount (after 60 seconds, every minute)
-                    if self.game_elapsed_frames >= self.next_difficulty_increase_time_for_spawn_amount and self.game_elapsed_frames >= 60 * 30:
-                        self.enemies_per_spawn *= 1.5
-                        self.next_difficulty_increase_time_for_spawn_amount += 60 * 30
-                elif self.game_state == "ENDLESS_MODE":
-                    # エンドレスモードの難易度スケーリング
-                    # チートモードがアクティブな場合は、スポーンレートを上書きしない
-                    if not self.cheat_mode_active:
-                        elapsed_frames_in_endless = pyxel.frame_count - self.endless_mode_start_time
-                        # 1分ごとに経過分の累乗倍 (2^経過分)
-                        elapsed_minutes_in_endless = elapsed_frames_in_endless // (60 * 30) # Convert to minutes
-
-                        # 指数関数的な増加: 2^elapsed_minutes_in_endless
-                        # 最低1体は保証し、過剰な敵の生成を防ぐために上限を設定することも検討
-                        self.enemies_per_spawn = max(1, int(2 ** elapsed_minutes_in_endless))
-
-                    # エンドレスモードではウルトラショットゴーストを含むすべてのゴーストが出現
-                    spawn_types = ["normal", "shot", "shield", "super_shield", "ultra_shot", "big_normal"] # Add big_normal ghost
-
-                for _ in range(int(self.enemies_per_spawn)):
-                    if spawn_types:
-                        chosen_type = random.choice(spawn_types)
-                        # ショットゴーストの置き換えロジックを削除
-                        if chosen_type == "normal":
-                            self.enemies.append(Enemy(self.player_x, self.player_y))
-                        elif chosen_type == "shot":
-                            self.shot_ghosts.append(ShotGhost(self.player_x, self.player_y))
-                        elif chosen_type == "shield":
-                            self.shield_ghosts.append(ShieldGhost(self.player_x, self.player_y))
-                        elif chosen_type == "super_shield":
-                            self.super_shield_ghosts.append(SuperShieldGhost(self.player_x, self.player_y))
-                        elif chosen_type == "ultra_shot": # このブランチは直接ウルトラショットゴーストを生成
-                            self.ultra_shot_ghosts.append(UltraShotGhost())
-                        elif chosen_type == "big_normal": # Big Normal Ghost
-                            self.big_normal_ghosts.append(BigNormalGhost(self.player_x, self.player_y))
+            if self.enemy_spawn_timer >= spawn_interval:
+                if self.game_state == "ENDLESS_MODE":
+                    spawn_count = self.make_room(spawn_count + self.deferred_spawns)
+                self.spawn_wave(spawn_types, spawn_count, spawn_weights)
                 self.enemy_spawn_timer = 0
 
+            # Delayed weapons whose activation frame has come join their live collections
+            self.activation_queue.release(pyxel.frame_count)
+
             # --- Enemy Update and Collision Detection ---
-            self.enemies = [enemy for enemy in self.enemies if not enemy.is_outside_screen()]
-            self.shot_ghosts = [ghost for ghost in self.shot_ghosts if not ghost.is_outside_screen()]
-            self.shield_ghosts = [ghost for ghost in self.shield_ghosts if not ghost.is_outside_screen()]
-            self.super_shield_ghosts = [ghost for ghost in self.super_shield_ghosts if not ghost.is_outside_screen()]
-            self.ultra_shot_ghosts = [ghost for ghost in self.ultra_shot_ghosts if not ghost.is_outside_screen()] # New
-            self.big_normal_ghosts = [ghost for ghost in self.big_normal_ghosts if not ghost.is_outside_screen()] # New
-
-            enemies_to_remove_by_barrier = [] # New list for enemies defeated by barrier
-
-            # Normal enemies
-            for enemy in self.enemies:
-                enemy.update(self.player_x, self.player_y)
-                enemy_rect = (enemy.x, enemy.y, enemy.size, enemy.size)
-                if self.check_collision_rect(player_rect_for_collision, enemy_rect):
-                    # Check if barrier is active before taking damage
-                    if self.invincible_timer == 0 and not self.barrier_active:
-                        self.hp -= 1
-                        pyxel.play(0, 1)
-                        self.invincible_timer = self.invincible_duration
-                        if self.hp <= 0:
-                            self.hp = 0
-                            self.is_game_over = True
-                    elif self.barrier_active: # Barrier active, deal damage to enemy
-                        is_dead = enemy.take_damage()
-                        if is_dead:
-                            self.kill_count += self.player_attack_power
-                            pyxel.play(0, 2)
-                            self.experience_orbs.append(ExperienceOrb(enemy.x + enemy.size // 2, enemy.y + enemy.size // 2))
-                            enemies_to_remove_by_barrier.append(enemy) # Add to removal list
-            
-            # Shot Ghosts
-            for ghost in self.shot_ghosts:
-                ghost.update(self.player_x, self.player_y)
-                # If in idle state and hasn't fired a bullet yet, spawn a bullet
-                if ghost.state == "IDLE" and not ghost.bullet_fired:
-                    # Shot Ghost's bullet targets the player
-                    ghost_center_x = ghost.x + ghost.size // 2
-                    ghost_center_y = ghost.y + 8 // 2 # Shot Ghost height is 8
-                    self.enemy_bullets.append(Bullet(
-                        ghost_center_x, ghost_center_y,
-                        self.player_x + player_display_width // 2,
-                        self.player_y + player_display_height // 2,
-                        speed=0.5, # Slow down bullet flight speed (0.8 -> 0.5)
-                        size=4, # 4x4 size
-                        damage=1, # Deals 1 damage
-                        drops_exp=True, # Drops EXP
-                        is_enemy_bullet=True # Mark as enemy bullet
-                    ))
-                    ghost.bullet_fired = True # Record that bullet was fired
-
-                ghost_rect = (ghost.x, ghost.y, ghost.size, 8) # Shot Ghost height is 8
-                if self.check_collision_rect(player_rect_for_collision, ghost_rect):
-                    # Check if barrier is active before taking damage
-                    if self.invincible_timer == 0 and not self.barrier_active:
-                        self.hp -= 1
-                        pyxel.play(0, 1)
-                        self.invincible_timer = self.invincible_duration
-                        if self.hp <= 0:
-                            self.hp = 0
-                            self.is_game_over = True
-                    elif self.barrier_active: # Barrier active, deal damage to enemy
-                        is_dead = ghost.take_damage()
-                        if is_dead:
-                            self.kill_count += self.player_attack_power
-                            pyxel.play(0, 2)
-                            self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-                            enemies_to_remove_by_barrier.append(ghost) # Add to removal list
-
-            # Shield Ghosts
-            for ghost in self.shield_ghosts:
-                ghost.update(self.player_x, self.player_y)
-                ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                # Only deal damage if Shield Ghost is not invincible (blinking)
-                if self.check_collision_rect(player_rect_for_collision, ghost_rect) and ghost.state != "DAMAGED_BLINK":
-                    # Check if barrier is active before taking damage
-                    if self.invincible_timer == 0 and not self.barrier_active:
-                        self.hp -= 1
-                        pyxel.play(0, 1)
-                        self.invincible_timer = self.invincible_duration
-                        if self.hp <= 0:
-                            self.hp = 0
-                            self.is_game_over = True
-                    elif self.barrier_active: # Barrier active, deal damage to enemy
-                        is_dead = ghost.take_damage()
-                        if is_dead:
-                            self.kill_count += self.player_attack_power
-                            pyxel.play(0, 2)
-                            self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                            enemies_to_remove_by_barrier.append(ghost) # Add to removal list
-
-            # Super Shield Ghosts (New)
-            for ghost in self.super_shield_ghosts:
-                ghost.update(self.player_x, self.player_y)
-                ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                if self.check_collision_rect(player_rect_for_collision, ghost_rect):
-                    # Check if barrier is active before taking damage
-                    if self.invincible_timer == 0 and not self.barrier_active: # Player invincibility
-                        self.hp -= 1
-                        pyxel.play(0, 1)
-                        self.invincible_timer = self.invincible_duration
-                        if self.hp <= 0:
-                            self.hp = 0
-                            self.is_game_over = True
-                    elif self.barrier_active: # Barrier active, deal damage to enemy
-                        is_dead = ghost.take_damage()
-                        if is_dead:
-                            self.kill_count += self.player_attack_power
-                            pyxel.play(1, 7) # Play sound 7 on channel 1 for SuperShieldGhost defeat
-                            self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                            enemies_to_remove_by_barrier.append(ghost) # Add to removal list
-
-
-            # Ultra Shot Ghosts (New)
-            for ghost in self.ultra_shot_ghosts:
-                bullet_to_fire = ghost.update(self.player_x, self.player_y)
-                if bullet_to_fire:
-                    self.enemy_bullets.append(bullet_to_fire)
-
-                ghost_rect = (ghost.x, ghost.y, ghost.size, 8) # Ultra Shot Ghost height is 8
-                if self.check_collision_rect(player_rect_for_collision, ghost_rect):
-                    # Check if barrier is active before taking damage
-                    if self.invincible_timer == 0 and not self.barrier_active: # Player invincibility
-                        self.hp -= 1
-                        pyxel.play(0, 1)
-                        self.invincible_timer = self.invincible_duration
-                        if self.hp <= 0:
-                            self.hp = 0
-                            self.is_game_over = True
-                    elif self.barrier_active: # Barrier active, deal damage to enemy
-                        is_dead = ghost.take_damage()
-                        if is_dead:
-                            self.kill_count += self.player_attack_power
-                            pyxel.play(0, 2)
-                            self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-                            enemies_to_remove_by_barrier.append(ghost) # Add to removal list
-
-            # Big Normal Ghosts (New)
-            for ghost in self.big_normal_ghosts:
-                ghost.update(self.player_x, self.player_y)
-                ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                if self.check_collision_rect(player_rect_for_collision, ghost_rect):
-                    # Check if barrier is active before taking damage
-                    if self.invincible_timer == 0 and not self.barrier_active:
-                        self.hp -= 3 # 3 times more damage
-                        pyxel.play(0, 1)
-                        self.invincible_timer = self.invincible_duration
-                        if self.hp <= 0:
-                            self.hp = 0
-                            self.is_game_over = True
-                    elif self.barrier_active: # Barrier active, deal damage to enemy
-                        is_dead = ghost.take_damage()
-                        if is_dead:
-                            self.kill_count += self.player_attack_power
-                            pyxel.play(0, 2) # Use normal enemy defeated sound
-                            self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                            enemies_to_remove_by_barrier.append(ghost) # Add to removal list
-
-            # Filter out enemies defeated by barrier
-            self.enemies = [enemy for enemy in self.enemies if enemy not in enemies_to_remove_by_barrier]
-            self.shot_ghosts = [ghost for ghost in self.shot_ghosts if ghost not in enemies_to_remove_by_barrier]
-            self.shield_ghosts = [ghost for ghost in self.shield_ghosts if ghost not in enemies_to_remove_by_barrier]
-            self.super_shield_ghosts = [ghost for ghost in self.super_shield_ghosts if ghost not in enemies_to_remove_by_barrier]
-            self.ultra_shot_ghosts = [ghost for ghost in self.ultra_shot_ghosts if ghost not in enemies_to_remove_by_barrier]
-            self.big_normal_ghosts = [ghost for ghost in self.big_normal_ghosts if ghost not in enemies_to_remove_by_barrier]
+            # Dead entities are only flagged during the frame; compact_entities() drops them at the end
+            live_ghosts = []
+            for ghost in self.enemies:
+                if ghost.is_outside_screen():
+                    self.enemies.kill(ghost)
+                else:
+                    live_ghosts.append(ghost)
+
+            # Per-type state (timers, firing); Normal and Big Normal Ghosts have none
+            # Shot, Shield and Ultra Shot Ghosts are updated a state-machine cohort at a time
+            for kind in STATEFUL_ENEMY_KINDS:
+                ghosts = self.enemies.of_kind(kind)
+                fsm = self.enemies.machines.get(kind)
+                for pattern, origins in GHOST_CLASSES[kind].update_all(ghosts, fsm, self.player_x, self.player_y):
+                    # Shot and Ultra Shot Ghosts fire at the player's center (player size 8x8)
+                    self.enemy_bullets.emit(pattern, origins, self.player_x + 4, self.player_y + 4)
+
+            # Move every ghost toward the player in one batched step
+            chase_step(live_ghosts, self.player_x, self.player_y)
+
+            # Packs that get close to the player break up into individual ghosts
+            player_center_x = self.player_x + player_display_width / 2
+            player_center_y = self.player_y + player_display_height / 2
+            for horde in list(self.enemies.of_kind("horde")):
+                if not horde.dead and abs(horde.x + horde.size / 2 - player_center_x) < HORDE_SPLIT_DISTANCE and \
+                   abs(horde.y + horde.height / 2 - player_center_y) < HORDE_SPLIT_DISTANCE:
+                    live_ghosts.extend(self.split_horde(horde))
+
+            # Ghosts spread out instead of stacking up
+            if CROWD_SEPARATION:
+                separation_step(live_ghosts, self.crowd_grid)
 
 
             self.attack_timer += 1
@@ -1482,7 +2294,7 @@ class App:
                         current_facing_right = not self.facing_right
 
                     # Pass initial offset and delay to Attack constructor
-                    self.attacks.append(Attack(
+                    self.launch(self.attacks, Attack(
                         self.player_x,
                         self.player_y,
                         0, # x_offset remains 0
@@ -1495,131 +2307,31 @@ class App:
             for attack in self.attacks:
                 # Pass player's current position so attack follows player
                 attack.update(self.player_x, self.player_y)
-            self.attacks = [attack for attack in self.attacks if attack.is_alive()]
-
-            hit_enemies_this_frame = [] # To prevent hitting the same enemy multiple times in one frame
-            # Attack detection for normal enemies
-            for attack in self.attacks:
-                for enemy in self.enemies:
-                    if enemy not in hit_enemies_this_frame:
-                        if attack.check_collision(enemy):
-                            is_dead = enemy.take_damage()
-                            if is_dead:
-                                hit_enemies_this_frame.append(enemy)
-                                self.kill_count += self.player_attack_power # Increase kill count according to attack power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(enemy.x + enemy.size // 2, enemy.y + enemy.size // 2))
-
-            # Attack detection for Shot Ghosts
-            for attack in self.attacks:
-                for ghost in self.shot_ghosts:
-                    if ghost not in hit_enemies_this_frame:
-                        # Shot Ghost hitbox is 16x8
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8) 
-                        if attack.check_collision(type("obj", (object,), {"x": ghost.x, "y": ghost.y, "size": ghost.size})()): # Collision detection with pseudo Enemy object
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                hit_enemies_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-            # Attack detection for Shield Ghosts
-            for attack in self.attacks:
-                for ghost in self.shield_ghosts:
-                    if ghost not in hit_enemies_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        # Collision detection with pseudo Enemy object
-                        if attack.check_collision(type("obj", (object,), {"x": ghost.x, "y": ghost.y, "size": ghost.size})()): 
-                            is_dead = ghost.take_damage()
-                            if is_dead: # When shield breaks or defeated
-                                hit_enemies_this_frame.append(ghost) # Temporarily add to remove from list
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-            # Attack detection for Super Shield Ghosts (New)
-            for attack in self.attacks:
-                for ghost in self.super_shield_ghosts:
-                    if ghost not in hit_enemies_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if attack.check_collision(type("obj", (object,), {"x": ghost.x, "y": ghost.y, "size": ghost.size})()):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                hit_enemies_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(1, 7) # Play sound 7 on channel 1 for SuperShieldGhost defeat
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-            # Attack detection for Ultra Shot Ghosts (New)
-            for attack in self.attacks:
-                for ghost in self.ultra_shot_ghosts:
-                    if ghost not in hit_enemies_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8) # Ultra Shot Ghost height is 8
-                        if attack.check_collision(type("obj", (object,), {"x": ghost.x, "y": ghost.y, "size": ghost.size})()):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                hit_enemies_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-            # Attack detection for Big Normal Ghosts (New)
-            for attack in self.attacks:
-                for ghost in self.big_normal_ghosts:
-                    if ghost not in hit_enemies_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if attack.check_collision(type("obj", (object,), {"x": ghost.x, "y": ghost.y, "size": ghost.size})()):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                hit_enemies_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2) # Use normal enemy defeated sound
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-
-            self.enemies = [enemy for enemy in self.enemies if enemy not in hit_enemies_this_frame]
-            self.shot_ghosts = [ghost for ghost in self.shot_ghosts if ghost not in hit_enemies_this_frame]
-            self.shield_ghosts = [ghost for ghost in self.shield_ghosts if ghost not in hit_enemies_this_frame]
-            self.super_shield_ghosts = [ghost for ghost in self.super_shield_ghosts if ghost not in hit_enemies_this_frame]
-            self.ultra_shot_ghosts = [ghost for ghost in self.ultra_shot_ghosts if ghost not in hit_enemies_this_frame] # New
-            self.big_normal_ghosts = [ghost for ghost in self.big_normal_ghosts if ghost not in hit_enemies_this_frame] # New
+                if not attack.is_alive():
+                    attack.dead = True
 
 
             # --- Experience Orb Processing ---
-            collected_orbs = []
-            orbs_to_remove_by_ghost = [] # New list for orbs cleared by BigNormalGhost
-            for orb in self.experience_orbs:
-                # Pass player's attraction range to experience orb's update
-                orb.update(self.player_x, self.player_y, self.exp_attraction_range) 
-                orb_rect = orb.get_rect() # Get orb's collision rectangle
-                if self.check_collision_rect(player_rect_for_collision, orb_rect):
-                    collected_orbs.append(orb)
-                    self.exp += orb.value # Add experience
-                    pyxel.play(0, 3) # Orb acquisition sound (sound 3 on sound channel 0)
-
-            # Check for EXP orb clearing by BigNormalGhost
-            for ghost in self.big_normal_ghosts:
-                clear_rect = ghost.get_exp_clear_rect()
-                for orb in self.experience_orbs:
-                    if orb not in collected_orbs and orb not in orbs_to_remove_by_ghost: # Don't clear already collected orbs
-                        orb_center_x = orb.x
-                        orb_center_y = orb.y
-                        # Check if orb's center is within the clear_rect
-                        if clear_rect[0] < orb_center_x < clear_rect[0] + clear_rect[2] and \
-                           clear_rect[1] < orb_center_y < clear_rect[1] + clear_rect[3]:
-                            orbs_to_remove_by_ghost.append(orb)
-
-            # Remove collected orbs and orbs cleared by BigNormalGhost
-            self.experience_orbs = [orb for orb in self.experience_orbs if orb not in collected_orbs and orb not in orbs_to_remove_by_ghost]
+            # Pass player's attraction range to the orb field
+            self.experience_orbs.attract(self.player_x, self.player_y, self.exp_attraction_range)
+            collected_exp = self.experience_orbs.collect(player_rect_for_collision) # Sum of the orbs' values
+            if collected_exp > 0:
+                self.exp += collected_exp # Add experience
+                pyxel.play(0, 3) # Orb acquisition sound (sound 3 on sound channel 0), once per frame
+
+            # Check for EXP orb clearing by ghost types with an exp_clear_radius (collected orbs are already gone)
+            clear_rects = [ghost.get_exp_clear_rect() for kind in EXP_CLEARING_KINDS for ghost in self.enemies.of_kind(kind) if not ghost.dead]
+            clear_rects += [horde.get_exp_clear_rect() for horde in self.enemies.of_kind("horde") if not horde.dead and horde.member_class.exp_clear_radius]
+            self.experience_orbs.clear_in_rects(clear_rects)
+            if pyxel.frame_count % ORB_MERGE_INTERVAL == 0:
+                self.experience_orbs.coalesce() # Attracted and newly dropped orbs drift together
 
 
             # --- Player Bullet Skill Processing ---
             if self.can_spawn_bullet:
                 self.bullet_spawn_timer += 1
                 if self.bullet_spawn_timer >= self.bullet_spawn_interval:
-                    # Fix: Add ultra_shot_ghosts and big_normal_ghosts to all_enemies list for targeting
-                    all_enemies = self.enemies + self.shot_ghosts + self.shield_ghosts + self.super_shield_ghosts + self.ultra_shot_ghosts + self.big_normal_ghosts
+                    all_enemies = [ghost for ghost in self.enemies if not ghost.dead] # Every ghost type is a target
                     if all_enemies: # Only fire bullets if there are enemies
                         # Player's center coordinates
                         player_center_x = self.player_x + player_display_width // 2
@@ -1633,7 +2345,7 @@ class App:
                             target_enemy = sorted_enemies[i]
                             # Add a slight delay to each bullet
                             bullet_delay = i * 3 # e.g., delay by 3 frames each
-                            self.bullets.append(Bullet(
+                            self.launch(self.bullets, self.bullets.take(
                                 player_center_x,
                                 player_center_y,
                                 target_enemy.x + target_enemy.size // 2, # Target enemy's center
@@ -1645,298 +2357,19 @@ class App:
                         pyxel.play(0, 0) # Placeholder sound
                     self.bullet_spawn_timer = 0
 
-            # Player bullet update and collision detection
-            bullets_to_remove = []
-            enemies_to_remove_by_bullet = []
+            # Player bullet update (collisions are handled by collide())
             for bullet in self.bullets:
                 bullet.update()
                 if not bullet.is_alive():
-                    bullets_to_remove.append(bullet)
-                    continue # No need for collision detection if bullet is gone
-
-                # Collision detection for normal enemies
-                for enemy in self.enemies:
-                    if enemy not in enemies_to_remove_by_bullet:
-                        bullet_rect = bullet.get_rect()
-                        enemy_rect = (enemy.x, enemy.y, enemy.size, enemy.size)
-                        if self.check_collision_rect(bullet_rect, enemy_rect):
-                            is_dead = enemy.take_damage()
-                            if is_dead:
-                                bullets_to_remove.append(bullet)
-                                enemies_to_remove_by_bullet.append(enemy)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(enemy.x + enemy.size // 2, enemy.y + enemy.size // 2))
-                                break # This bullet already hit, move to next bullet
-
-                # Collision detection for Shot Ghosts
-                for ghost in self.shot_ghosts:
-                    if ghost not in enemies_to_remove_by_bullet:
-                        bullet_rect = bullet.get_rect()
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8) # 16x8
-                        if self.check_collision_rect(bullet_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                bullets_to_remove.append(bullet)
-                                enemies_to_remove_by_bullet.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-                                break
-
-                # Collision detection for Shield Ghosts
-                for ghost in self.shield_ghosts:
-                    if ghost not in enemies_to_remove_by_bullet:
-                        bullet_rect = bullet.get_rect()
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size) # 8x8
-                        if self.check_collision_rect(bullet_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                bullets_to_remove.append(bullet)
-                                enemies_to_remove_by_bullet.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                            break
-
-                # Collision detection for Super Shield Ghosts (New)
-                for ghost in self.super_shield_ghosts:
-                    if ghost not in enemies_to_remove_by_bullet:
-                        bullet_rect = bullet.get_rect()
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size) # 8x8
-                        if self.check_collision_rect(bullet_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                bullets_to_remove.append(bullet)
-                                enemies_to_remove_by_bullet.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(1, 7) # Play sound 7 on channel 1 for SuperShieldGhost defeat
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                            break
-
-                # Collision detection for Ultra Shot Ghosts (New)
-                for ghost in self.ultra_shot_ghosts:
-                    if ghost not in enemies_to_remove_by_bullet:
-                        bullet_rect = bullet.get_rect()
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8) # 16x8
-                        if self.check_collision_rect(bullet_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                bullets_to_remove.append(bullet)
-                                enemies_to_remove_by_bullet.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-                            break
-
-                # Collision detection for Big Normal Ghosts (New)
-                for ghost in self.big_normal_ghosts:
-                    if ghost not in enemies_to_remove_by_bullet:
-                        bullet_rect = bullet.get_rect()
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size) # 16x16
-                        if self.check_collision_rect(bullet_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                bullets_to_remove.append(bullet)
-                                enemies_to_remove_by_bullet.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                            break
-
-
-            self.bullets = [b for b in self.bullets if b not in bullets_to_remove]
-            # Reapply bullets_to_remove here to remove player bullets that disappeared due to collision with enemy bullets
-            self.bullets = [b for b in self.bullets if b not in bullets_to_remove]
-            self.enemies = [e for e in self.enemies if e not in enemies_to_remove_by_bullet]
-            self.shot_ghosts = [g for g in self.shot_ghosts if g not in enemies_to_remove_by_bullet]
-            self.shield_ghosts = [g for g in self.shield_ghosts if g not in enemies_to_remove_by_bullet]
-            self.super_shield_ghosts = [g for g in self.super_shield_ghosts if g not in enemies_to_remove_by_bullet]
-            self.ultra_shot_ghosts = [g for g in self.ultra_shot_ghosts if g not in enemies_to_remove_by_bullet] # New
-            self.big_normal_ghosts = [g for g in self.big_normal_ghosts if g not in enemies_to_remove_by_bullet] # New
-
-
-            # --- Enemy Bullet Update and Collision Detection with Player ---
-            enemy_bullets_to_remove = []
-            for e_bullet in self.enemy_bullets:
-                e_bullet.update()
-                if not e_bullet.is_alive():
-                    enemy_bullets_to_remove.append(e_bullet)
-                    continue
-                
-                e_bullet_rect = e_bullet.get_rect()
-                # If hits player (and barrier is not active)
-                if self.invincible_timer == 0 and not self.barrier_active and self.check_collision_rect(player_rect_for_collision, e_bullet_rect):
-                    self.hp -= e_bullet.damage # Use bullet's damage value
-                    pyxel.play(0, 1)
-                    self.invincible_timer = self.invincible_duration
-                    if self.hp <= 0:
-                        self.hp = 0
-                        self.is_game_over = True
-                    enemy_bullets_to_remove.append(e_bullet)
-                    continue # No need for collision detection with other attacks if hit player
-
-                # If hit by player's attack (sword attack)
-                hit_by_player_attack = False
-                for attack in self.attacks:
-                    if attack.check_collision(type("obj", (object,), {"x": e_bullet_rect[0], "y": e_bullet_rect[1], "size": e_bullet_rect[2]})()):
-                        enemy_bullets_to_remove.append(e_bullet)
-                        pyxel.play(0, 2) # Disappearance sound
-                        if e_bullet.drops_exp: # Only drop EXP if bullet is configured to do so
-                            self.experience_orbs.append(ExperienceOrb(e_bullet_rect[0] + e_bullet_rect[2]//2, e_bullet_rect[1] + e_bullet_rect[3]//2)) # Experience orb
-                        hit_by_player_attack = True
-                        break # One bullet only hits one attack
-                if hit_by_player_attack:
-                    continue # Already gone, no need for collision detection with other attacks
-
-                # Collision between player bullet and enemy bullet
-                hit_by_player_bullet = False
-                for p_bullet in self.bullets:
-                     p_bullet_rect = p_bullet.get_rect()
-                     if self.check_collision_rect(e_bullet_rect, p_bullet_rect):
-                         enemy_bullets_to_remove.append(e_bullet)
-                         bullets_to_remove.append(p_bullet) # Player bullet also disappears
-                         pyxel.play(0, 2) # Disappearance sound
-                         if e_bullet.drops_exp: # Only drop EXP if bullet is configured to do so
-                            self.experience_orbs.append(ExperienceOrb(e_bullet_rect[0] + e_bullet_rect[2]//2, e_bullet_rect[1] + e_bullet_rect[3]//2)) # Experience orb
-                         hit_by_player_bullet = True
-                         break
-                if hit_by_player_bullet:
-                    continue # Already gone, no need for collision detection with other attacks
-
-                # Collision with satellite
-                hit_by_satellite = False
-                for satellite in self.satellites:
-                    sat_rect = satellite.get_rect()
-                    if self.check_collision_rect(sat_rect, e_bullet_rect):
-                        enemy_bullets_to_remove.append(e_bullet)
-                        pyxel.play(0, 2) # Disappearance sound
-                        if e_bullet.drops_exp: # Only drop EXP if bullet is configured to do so
-                            self.experience_orbs.append(ExperienceOrb(e_bullet_rect[0] + e_bullet_rect[2]//2, e_bullet_rect[1] + e_bullet_rect[3]//2))
-                        hit_by_satellite = True
-                        break
-                if hit_by_satellite:
-                    continue # Already gone, no need for collision detection with other attacks
-
-                # Collision with meteor
-                hit_by_meteor = False
-                for meteor in self.meteors:
-                    if meteor.state == "EXPLODING":
-                        explosion_rect = meteor.get_explosion_rect()
-                        if explosion_rect and self.check_collision_rect(explosion_rect, e_bullet_rect):
-                            enemy_bullets_to_remove.append(e_bullet)
-                            pyxel.play(0, 2) # Disappearance sound
-                            if e_bullet.drops_exp: # Only drop EXP if bullet is configured to do so
-                                self.experience_orbs.append(ExperienceOrb(e_bullet_rect[0] + e_bullet_rect[2]//2, e_bullet_rect[1] + e_bullet_rect[3]//2))
-                            hit_by_meteor = True
-                            # Meteor can destroy multiple bullets, so don't break
-                if hit_by_meteor:
-                    continue # Already gone, no need for collision detection with other attacks
-
-                # Collision with Cutter (New Skill)
-                hit_by_cutter = False
-                for cutter in self.cutters:
-                    cutter_rect = cutter.get_rect()
-                    if self.check_collision_rect(cutter_rect, e_bullet_rect):
-                        enemy_bullets_to_remove.append(e_bullet)
-                        pyxel.play(0, 2) # Disappearance sound
-                        if e_bullet.drops_exp:
-                            self.experience_orbs.append(ExperienceOrb(e_bullet_rect[0] + e_bullet_rect[2]//2, e_bullet_rect[1] + e_bullet_rect[3]//2))
-                        hit_by_cutter = True
-                        break
-                if hit_by_cutter:
-                    continue
+                    bullet.dead = True
 
 
-            self.enemy_bullets = [b for b in self.enemy_bullets if b not in enemy_bullets_to_remove]
-            # Here, reapply bullets_to_remove to remove player bullets that disappeared due to collision with enemy bullets
-            self.bullets = [b for b in self.bullets if b not in bullets_to_remove]
+            # --- Enemy Bullet Update ---
+            self.enemy_bullets.update() # Moves every bullet and marks the expired ones dead
 
 
             # --- Satellite Skill Processing ---
-            satellites_to_remove_enemies = [] # Record enemies defeated by satellites
-            for satellite in self.satellites:
-                satellite.update(self.player_x, self.player_y)
-                sat_rect = satellite.get_rect()
-
-                # Normal enemies
-                for enemy in self.enemies:
-                    if enemy not in satellites_to_remove_enemies:
-                        enemy_rect = (enemy.x, enemy.y, enemy.size, enemy.size)
-                        if self.check_collision_rect(sat_rect, enemy_rect):
-                            is_dead = enemy.take_damage()
-                            if is_dead:
-                                satellites_to_remove_enemies.append(enemy)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(enemy.x + enemy.size // 2, enemy.y + enemy.size // 2))
-
-                # Shot Ghosts
-                for ghost in self.shot_ghosts:
-                    if ghost not in satellites_to_remove_enemies:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8)
-                        if self.check_collision_rect(sat_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                satellites_to_remove_enemies.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-                # Shield Ghosts
-                for ghost in self.shield_ghosts:
-                    if ghost not in satellites_to_remove_enemies:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if self.check_collision_rect(sat_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                satellites_to_remove_enemies.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-                # Super Shield Ghosts (New)
-                for ghost in self.super_shield_ghosts:
-                    if ghost not in satellites_to_remove_enemies:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if self.check_collision_rect(sat_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                satellites_to_remove_enemies.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(1, 7) # Play sound 7 on channel 1 for SuperShieldGhost defeat
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-                # Ultra Shot Ghosts (New)
-                for ghost in self.ultra_shot_ghosts:
-                    if ghost not in satellites_to_remove_enemies:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8)
-                        if self.check_collision_rect(sat_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                satellites_to_remove_enemies.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-                # Big Normal Ghosts (New)
-                for ghost in self.big_normal_ghosts:
-                    if ghost not in satellites_to_remove_enemies:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if self.check_collision_rect(sat_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                satellites_to_remove_enemies.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-            
-            self.enemies = [e for e in self.enemies if e not in satellites_to_remove_enemies]
-            self.shot_ghosts = [g for g in self.shot_ghosts if g not in satellites_to_remove_enemies]
-            self.shield_ghosts = [g for g in self.shield_ghosts if g not in satellites_to_remove_enemies]
-            self.super_shield_ghosts = [g for g in self.super_shield_ghosts if g not in satellites_to_remove_enemies]
-            self.ultra_shot_ghosts = [g for g in self.ultra_shot_ghosts if g not in satellites_to_remove_enemies] # New
-            self.big_normal_ghosts = [g for g in self.big_normal_ghosts if g not in satellites_to_remove_enemies] # New
+            Satellite.update_all(self.satellites, self.player_x, self.player_y)
 
 
             # --- Meteor Skill Processing ---
@@ -1954,102 +2387,15 @@ class App:
                         # Stagger arrival timing of each meteor
                         meteor_delay = i * 10 # Delay by 10 frames each
 
-                        self.meteors.append(Meteor(
+                        self.launch(self.meteors, Meteor(
                             start_x, start_y,
                             target_x, target_y,
-                            fly_duration=60, # 1 second flight (60 frames)
-                            explode_duration=120, # 2 second explosion (120 frames)
                             initial_delay=meteor_delay # Pass delay
                         ))
                     self.meteor_spawn_timer = 0
             
-            # Meteor update and collision detection
-            meteors_to_remove = []
-            enemies_to_remove_by_meteor = []
-            for meteor in self.meteors:
-                meteor.update()
-                if not meteor.is_alive():
-                    meteors_to_remove.append(meteor)
-                    continue # No need to process if meteor is gone
-
-                if meteor.state == "EXPLODING":
-                    explosion_rect = meteor.get_explosion_rect()
-                    if explosion_rect:
-                        # Normal enemies
-                        for enemy in self.enemies:
-                            if enemy not in enemies_to_remove_by_meteor:
-                                enemy_rect = (enemy.x, enemy.y, enemy.size, enemy.size)
-                                if self.check_collision_rect(explosion_rect, enemy_rect):
-                                    is_dead = enemy.take_damage()
-                                    if is_dead:
-                                        enemies_to_remove_by_meteor.append(enemy)
-                                        self.kill_count += self.player_attack_power
-                                        self.experience_orbs.append(ExperienceOrb(enemy.x + enemy.size // 2, enemy.y + enemy.size // 2))
-
-                        # Shot Ghosts
-                        for ghost in self.shot_ghosts:
-                            if ghost not in enemies_to_remove_by_meteor:
-                                ghost_rect = (ghost.x, ghost.y, ghost.size, 8)
-                                if self.check_collision_rect(explosion_rect, ghost_rect):
-                                    is_dead = ghost.take_damage()
-                                    if is_dead:
-                                        enemies_to_remove_by_meteor.append(ghost)
-                                        self.kill_count += self.player_attack_power
-                                        self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-                        # Shield Ghosts
-                        for ghost in self.shield_ghosts:
-                            if ghost not in enemies_to_remove_by_meteor:
-                                ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                                if self.check_collision_rect(explosion_rect, ghost_rect):
-                                    is_dead = ghost.take_damage()
-                                    if is_dead:
-                                        enemies_to_remove_by_meteor.append(ghost)
-                                        self.kill_count += self.player_attack_power
-                                        self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-                        # Super Shield Ghosts (New)
-                        for ghost in self.super_shield_ghosts:
-                            if ghost not in enemies_to_remove_by_meteor:
-                                ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                                if self.check_collision_rect(explosion_rect, ghost_rect):
-                                    is_dead = ghost.take_damage()
-                                    if is_dead:
-                                        enemies_to_remove_by_meteor.append(ghost)
-                                        self.kill_count += self.player_attack_power
-                                        self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-                                        pyxel.play(1, 7) # Play sound 7 on channel 1 for SuperShieldGhost defeat
-
-                        # Ultra Shot Ghosts (New)
-                        for ghost in self.ultra_shot_ghosts:
-                            if ghost not in enemies_to_remove_by_meteor:
-                                ghost_rect = (ghost.x, ghost.y, ghost.size, 8)
-                                if self.check_collision_rect(explosion_rect, ghost_rect):
-                                    is_dead = ghost.take_damage()
-                                    if is_dead:
-                                        enemies_to_remove_by_meteor.append(ghost)
-                                        self.kill_count += self.player_attack_power
-                                        self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-                        # Big Normal Ghosts (New)
-                        for ghost in self.big_normal_ghosts:
-                            if ghost not in enemies_to_remove_by_meteor:
-                                ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                                if self.check_collision_rect(explosion_rect, ghost_rect):
-                                    is_dead = ghost.take_damage()
-                                    if is_dead:
-                                        enemies_to_remove_by_meteor.append(ghost)
-                                        self.kill_count += self.player_attack_power
-                                        self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-
-            self.meteors = [m for m in self.meteors if m not in meteors_to_remove]
-            self.enemies = [e for e in self.enemies if e not in enemies_to_remove_by_meteor]
-            self.shot_ghosts = [g for g in self.shot_ghosts if g not in enemies_to_remove_by_meteor]
-            self.shield_ghosts = [g for g in self.shield_ghosts if g not in enemies_to_remove_by_meteor]
-            self.super_shield_ghosts = [g for g in self.super_shield_ghosts if g not in enemies_to_remove_by_meteor]
-            self.ultra_shot_ghosts = [g for g in self.ultra_shot_ghosts if g not in enemies_to_remove_by_meteor] # New
-            self.big_normal_ghosts = [g for g in self.big_normal_ghosts if g not in enemies_to_remove_by_meteor] # New
+            # Meteor update (batched per state)
+            Meteor.update_all(self.meteors, self.meteor_fsm)
 
             # --- Cutter Skill Processing (New) ---
             if self.can_spawn_cutter:
@@ -2060,7 +2406,7 @@ class App:
                         angle = random.uniform(0, 360)
                         # Slight delay for each cutter
                         cutter_delay = i * 5 # 5 frames delay per cutter
-                        self.cutters.append(Cutter(
+                        self.launch(self.cutters, self.cutters.take(
                             self.player_x + player_display_width // 2,
                             self.player_y + player_display_height // 2,
                             angle,
@@ -2071,97 +2417,18 @@ class App:
                         ))
                     self.cutter_spawn_timer = 0
             
-            # Cutter update and collision detection
-            cutters_to_remove = []
-            enemies_hit_by_cutter_this_frame = [] # To prevent multiple hits from one cutter in one frame
+            # Cutter update
             for cutter in self.cutters:
                 cutter.update()
                 if not cutter.is_alive():
-                    cutters_to_remove.append(cutter)
-                    continue
+                    cutter.dead = True
 
-                cutter_rect = cutter.get_rect()
-
-                # Collision with normal enemies
-                for enemy in self.enemies:
-                    if enemy not in enemies_hit_by_cutter_this_frame:
-                        enemy_rect = (enemy.x, enemy.y, enemy.size, enemy.size)
-                        if self.check_collision_rect(cutter_rect, enemy_rect):
-                            is_dead = enemy.take_damage()
-                            if is_dead:
-                                enemies_hit_by_cutter_this_frame.append(enemy)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(enemy.x + enemy.size // 2, enemy.y + enemy.size // 2))
-                
-                # Collision with Shot Ghosts
-                for ghost in self.shot_ghosts:
-                    if ghost not in enemies_hit_by_cutter_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8)
-                        if self.check_collision_rect(cutter_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                enemies_hit_by_cutter_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-                # Collision with Shield Ghosts
-                for ghost in self.shield_ghosts:
-                    if ghost not in enemies_hit_by_cutter_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if self.check_collision_rect(cutter_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                enemies_hit_by_cutter_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-                # Collision with Super Shield Ghosts
-                for ghost in self.super_shield_ghosts:
-                    if ghost not in enemies_hit_by_cutter_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if self.check_collision_rect(cutter_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                enemies_hit_by_cutter_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(1, 7)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-                # Collision with Ultra Shot Ghosts
-                for ghost in self.ultra_shot_ghosts:
-                    if ghost not in enemies_hit_by_cutter_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, 8)
-                        if self.check_collision_rect(cutter_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                enemies_hit_by_cutter_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + 8 // 2))
-
-                # Collision with Big Normal Ghosts
-                for ghost in self.big_normal_ghosts:
-                    if ghost not in enemies_hit_by_cutter_this_frame:
-                        ghost_rect = (ghost.x, ghost.y, ghost.size, ghost.size)
-                        if self.check_collision_rect(cutter_rect, ghost_rect):
-                            is_dead = ghost.take_damage()
-                            if is_dead:
-                                enemies_hit_by_cutter_this_frame.append(ghost)
-                                self.kill_count += self.player_attack_power
-                                pyxel.play(0, 2)
-                                self.experience_orbs.append(ExperienceOrb(ghost.x + ghost.size // 2, ghost.y + ghost.size // 2))
-
-
-            self.cutters = [c for c in self.cutters if c not in cutters_to_remove]
-            self.enemies = [e for e in self.enemies if e not in enemies_hit_by_cutter_this_frame]
-            self.shot_ghosts = [g for g in self.shot_ghosts if g not in enemies_hit_by_cutter_this_frame]
-            self.shield_ghosts = [g for g in self.shield_ghosts if g not in enemies_hit_by_cutter_this_frame]
-            self.super_shield_ghosts = [g for g in self.super_shield_ghosts if g not in enemies_hit_by_cutter_this_frame]
-            self.ultra_shot_ghosts = [g for g in self.ultra_shot_ghosts if g not in enemies_hit_by_cutter_this_frame]
-            self.big_normal_ghosts = [g for g in self.big_normal_ghosts if g not in enemies_hit_by_cutter_this_frame]
+            # Everything has moved: find every contact of this frame in one pass
+            self.collide(live_ghosts, player_rect_for_collision)
+
+            # Apply every weapon hit of this frame at once, then drop everything marked dead
+            self.resolve_hits()
+            self.compact_entities()
 
 
             # --- Level Up Processing ---
@@ -2250,13 +2517,268 @@ class App:
                 self.game_state = self.previous_game_state
 
 
-    def check_collision_rect(self, rect1, rect2):
-        x1, y1, w1, h1 = rect1
-        x2, y2, w2, h2 = rect2
-        return (x1 < x2 + w2 and
-                x1 + w1 > x2 and
-                y1 < y2 + h2 and
-                y1 + h1 > y2)
+    def damage_player(self, amount):
+        self.hp -= amount
+        pyxel.play(0, 1)
+        self.invincible_timer = self.invincible_duration
+        if self.hp <= 0:
+            self.hp = 0
+            self.is_game_over = True
+
+    def make_room(self, wanted):
+        # Endless mode entity budget: returns how many of the wanted ghosts may spawn this wave.
+        # The wave fills the room left under ENTITY_BUDGET and ENTITY_BUDGET_POLICY decides the rest;
+        # only what could never fit (more than a whole budget) is always carried over
+        held_back = max(0, wanted - ENTITY_BUDGET)
+        wanted -= held_back
+        live = len(self.enemies) + len(self.enemy_bullets) + len(self.experience_orbs)
+        live += sum(horde.count - 1 for horde in self.enemies.of_kind("horde")) # A horde counts as its members
+        shortfall = max(0, wanted - max(0, ENTITY_BUDGET - live))
+        if shortfall > 0 and ENTITY_BUDGET_POLICY == "evict":
+            # Lowest value first: the cheapest orbs (merged ones hold several kills), then the ghosts
+            # farthest from the player
+            evicted = self.experience_orbs.evict_cheapest(shortfall)
+            if shortfall > evicted:
+                px, py = self.player_x, self.player_y
+                farthest = heapq.nlargest(shortfall - evicted, self.enemies,
+                                          key=lambda ghost: (ghost.x - px) ** 2 + (ghost.y - py) ** 2)
+                for ghost in farthest:
+                    self.enemies.kill(ghost) # No kill credit or orb
+                    evicted += ghost.count if ghost.kind == "horde" else 1
+            self.evicted_count += evicted
+            shortfall = max(0, shortfall - evicted) # Evicting a horde can free more than needed
+        self.deferred_spawns = min(held_back + shortfall, ENTITY_BUDGET) # Never queue more than a full budget
+        return wanted - shortfall
+
+    def launch(self, collection, item):
+        # Weapons with an initial delay wait in the activation queue; the rest go live immediately
+        if item is None: # Refused by a full projectile pool
+            return
+        if item.initial_delay > 0:
+            self.activation_queue.schedule(pyxel.frame_count + item.initial_delay, collection, item)
+        else:
+            collection.append(item)
+
+    def spawn_wave(self, spawn_types, count, weights=None):
+        # Spawn count ghosts of the given types (optionally weighted) as one batch: the types of the whole wave are drawn at once,
+        # positions per type by edge_spawn_positions, and the ghosts go into the registry with add_many.
+        # In big endless waves Normal and Big Normal Ghosts are sent as hordes.
+        type_counts = dict.fromkeys(spawn_types, 0)
+        for chosen_type in random.choices(spawn_types, weights, k=count):
+            type_counts[chosen_type] += 1
+        use_hordes = self.game_state == "ENDLESS_MODE" and count >= HORDE_MIN_SIZE
+        player_x = self.player_x
+        player_y = self.player_y
+        ghosts = []
+        for chosen_type, type_count in type_counts.items():
+            ghost_class = GHOST_CLASSES[chosen_type]
+            if use_hordes and chosen_type in ("normal", "big_normal"):
+                while type_count >= HORDE_MIN_SIZE:
+                    pack_size = min(type_count, HORDE_MAX_SIZE)
+                    ghosts.append(Horde(ghost_class, pack_size, player_x, player_y))
+                    type_count -= pack_size
+                # Leftovers too few for a pack spawn individually
+            xs, ys = edge_spawn_positions(type_count, ghost_class.size, ghost_class.spawn_depth)
+            ghosts.extend([ghost_class(player_x, player_y, x, y) for x, y in zip(xs, ys)])
+        self.enemies.add_many(ghosts)
+
+    def emit_hit(self, ghost, projectile=None, play_sound=True, area=False):
+        # Weapon passes only record hits; resolve_hits() applies them once per frame
+        # projectile is marked dead if this hit kills; play_sound=False for kills whose weapon already made a sound;
+        # area=True for area-of-effect weapons, which hit a whole horde instead of splitting it
+        self.hit_events.append((ghost, projectile, play_sound, area))
+
+    def split_horde(self, horde):
+        # Replace a pack by its members, scattered around its position; returns the members
+        members = []
+        for i in range(horde.count):
+            x = horde.x + random.uniform(-HORDE_SPREAD, HORDE_SPREAD)
+            y = horde.y + random.uniform(-HORDE_SPREAD, HORDE_SPREAD)
+            if i == 0:
+                ghost = horde.leader
+                ghost.x = x
+                ghost.y = y
+                ghost.refresh_rect()
+            else: # Placed directly, so no spawn edge is drawn
+                ghost = horde.member_class(self.player_x, self.player_y, x, y)
+            ghost.hp = horde.member_hp
+            self.enemies.add(ghost)
+            members.append(ghost)
+        self.enemies.kill(horde)
+        return members
+
+    def resolve_hits(self):
+        # Damage stage for every hit recorded this frame. take_damage() ignores repeat hits within a frame,
+        # so only the first hit on each ghost counts. Kills are credited in one go, their EXP orbs are
+        # added in bulk and each defeat sound plays at most once
+        kill_xs = []
+        kill_ys = []
+        defeat_sounds = set() # (channel, sound)
+        for ghost, projectile, play_sound, area in self.hit_events:
+            if ghost.dead:
+                continue
+            if ghost.kind == "horde":
+                if area:
+                    killed = ghost.take_area_damage()
+                    if killed:
+                        if play_sound:
+                            defeat_sounds.add(DEFEAT_SOUND)
+                        kill_xs.extend([ghost.x + ghost.size // 2] * killed)
+                        kill_ys.extend([ghost.y + ghost.height // 2] * killed)
+                        self.enemies.kill(ghost)
+                    continue
+                ghost = self.split_horde(ghost)[0] # Single-target hits break the pack and land on one member
+            if not ghost.take_damage(): # Shield Ghosts survive their first hit
+                continue
+            if projectile is not None:
+                projectile.dead = True
+            if ghost.defeat_sound is not None: # A type's own defeat sound plays even for silent weapons
+                defeat_sounds.add(ghost.defeat_sound)
+            elif play_sound:
+                defeat_sounds.add(DEFEAT_SOUND)
+            kill_xs.append(ghost.x + ghost.size // 2)
+            kill_ys.append(ghost.y + ghost.height // 2)
+            self.enemies.kill(ghost)
+        self.hit_events.clear()
+
+        if kill_xs:
+            self.kill_count += len(kill_xs) * self.player_attack_power # Increase kill count according to attack power
+            self.experience_orbs.add_many(kill_xs, kill_ys)
+            for channel, sound in sorted(defeat_sounds):
+                pyxel.play(channel, sound)
+
+    def collide(self, ghosts, player_rect):
+        # Refill the collision world with every live collider, then handle the contacts of each
+        # COLLISION_MATRIX pair with the App method it names
+        world = self.collisions
+        world.clear()
+        world.add(LAYER_PLAYER, (None,), (player_rect,))
+        ghosts = [ghost for ghost in ghosts if not ghost.dead]
+        world.add(LAYER_GHOST, ghosts, [ghost.rect for ghost in ghosts])
+        attacks = [attack for attack in self.attacks if not attack.dead]
+        world.add(LAYER_ATTACK, attacks, [attack.get_rect() for attack in attacks])
+        bullets = [bullet for bullet in self.bullets if not bullet.dead]
+        world.add(LAYER_PLAYER_BULLET, bullets, [bullet.get_rect() for bullet in bullets],
+                  [bullet.get_motion() for bullet in bullets]) # Swept, so fast bullets can't skip over a ghost
+        e_bullets = self.enemy_bullets
+        live = [i for i, dead in enumerate(e_bullets.dead) if not dead] # Enemy bullets collide as field indices
+        xs = e_bullets.xs
+        ys = e_bullets.ys
+        world.add(LAYER_ENEMY_BULLET, live, [(xs[i] - 2, ys[i] - 2, 4, 4) for i in live]) # get_rect(i), inlined
+        satellite_rects = [satellite.get_rect() for satellite in self.satellites]
+        if len(self.satellites) >= SATELLITE_ORBIT_MIN:
+            world.add_orbit(LAYER_SATELLITE, self.satellites, satellite_rects, self.player_x + 4, self.player_y + 4)
+        else:
+            world.add(LAYER_SATELLITE, self.satellites, satellite_rects)
+        exploding = [meteor for meteor in self.meteors if not meteor.dead and meteor.state == METEOR_EXPLODING]
+        world.add_areas(LAYER_METEOR, exploding, [meteor.get_explosion_rect() for meteor in exploding])
+        cutters = [cutter for cutter in self.cutters if not cutter.dead]
+        world.add(LAYER_CUTTER, cutters, [cutter.get_rect() for cutter in cutters],
+                  [cutter.get_motion() for cutter in cutters])
+        world.run(self)
+
+    # --- Contact handlers (named in COLLISION_MATRIX); contacts are (first, second) collider pairs ---
+    def touch_ghosts(self, contacts):
+        for player, ghost in contacts:
+            if ghost.dead:
+                continue
+            # Shield Ghosts only deal damage when not invincible (blinking)
+            if not ghost.deals_contact_damage():
+                continue
+            # Check if barrier is active before taking damage
+            if self.invincible_timer == 0 and not self.barrier_active:
+                self.damage_player(ghost.contact_damage)
+            elif self.barrier_active: # Barrier active, deal damage to enemy
+                self.emit_hit(ghost)
+
+    def hit_ghosts(self, contacts):
+        # Sword attacks, satellites and cutters hit every ghost they touch
+        for weapon, ghost in contacts:
+            if not ghost.dead:
+                self.emit_hit(ghost)
+
+    def shoot_ghosts(self, contacts):
+        # A player bullet hits the first ghost on its path this frame; it is used up only if the hit kills
+        last_bullet = None
+        for bullet, ghost in contacts:
+            if bullet is not last_bullet and not ghost.dead:
+                last_bullet = bullet
+                self.emit_hit(ghost, projectile=bullet)
+        # Resolve now: a bullet used up by a kill must be gone before it can trade with an enemy bullet
+        self.resolve_hits()
+
+    def blast_ghosts(self, contacts):
+        # Every ghost in every explosion this frame, from one batched AoE query
+        for meteor, ghost in contacts:
+            if not ghost.dead:
+                self.emit_hit(ghost, play_sound=False, area=True) # Impact sound already played
+
+    def hit_player(self, contacts):
+        # Enemy bullets only hit when the player is neither invincible nor behind the barrier
+        e_bullets = self.enemy_bullets
+        for i, player in contacts:
+            if self.invincible_timer == 0 and not self.barrier_active:
+                self.damage_player(e_bullets.damages[i]) # Use bullet's damage value
+                e_bullets.dead[i] = True
+
+    def block_enemy_bullets(self, contacts):
+        for i, defense in contacts:
+            if not self.enemy_bullets.dead[i]:
+                self.destroy_enemy_bullet(i)
+
+    def trade_bullets(self, contacts):
+        # A player bullet and an enemy bullet destroy each other
+        for i, bullet in contacts:
+            if not self.enemy_bullets.dead[i] and not bullet.dead:
+                bullet.dead = True
+                self.destroy_enemy_bullet(i)
+
+    def destroy_enemy_bullet(self, i):
+        e_bullets = self.enemy_bullets
+        e_bullets.dead[i] = True
+        pyxel.play(0, 2) # Disappearance sound
+        if e_bullets.drops_exp[i]: # Only drop EXP if bullet is configured to do so
+            e_bullet_rect = e_bullets.get_rect(i)
+            self.experience_orbs.add(e_bullet_rect[0] + e_bullet_rect[2]//2, e_bullet_rect[1] + e_bullet_rect[3]//2) # Experience orb
+
+    def compact_entities(self):
+        # Single end-of-frame pass over each collection, dropping entities marked dead
+        self.enemies.compact()
+        # Lists are compacted in place: the activation queue holds references to them
+        self.attacks[:] = [attack for attack in self.attacks if not attack.dead]
+        self.bullets.compact() # Pooled projectiles go back to their free lists
+        self.enemy_bullets.compact()
+        for meteor in self.meteors:
+            if meteor.dead:
+                self.meteor_fsm.remove(meteor)
+        self.meteors[:] = [meteor for meteor in self.meteors if not meteor.dead]
+        self.cutters.compact()
+
+    def memory_report(self):
+        # Rows of (type name, live count, bytes per entity, total bytes) plus a "total" row.
+        # Weapons waiting in the activation queue and every preallocated pool object are included
+        groups = [(ghost_class.__name__, [ghost for ghost in self.enemies if type(ghost) is ghost_class])
+                  for ghost_class in (Enemy, ShotGhost, ShieldGhost, SuperShieldGhost, UltraShotGhost, BigNormalGhost, Horde)]
+        pending = list(self.activation_queue)
+        groups += [
+            ("Attack", self.attacks + [item for item in pending if type(item) is Attack]),
+            ("Satellite", self.satellites),
+            ("Meteor", self.meteors + [item for item in pending if type(item) is Meteor]),
+            ("Bullet", self.bullets.active + self.bullets.free + [item for item in pending if type(item) is Bullet]),
+            ("Cutter", self.cutters.active + self.cutters.free + [item for item in pending if type(item) is Cutter]),
+        ]
+        rows = []
+        for name, entities in groups:
+            total = sum(entity_size(entity) for entity in entities)
+            rows.append((name, len(entities), total // len(entities) if entities else 0, total))
+        orb_count = len(self.experience_orbs)
+        orb_total = self.experience_orbs.memory_size()
+        rows.append(("ExperienceOrb", orb_count, orb_total // orb_count if orb_count else 0, orb_total))
+        e_bullet_count = len(self.enemy_bullets)
+        e_bullet_total = self.enemy_bullets.memory_size()
+        rows.append(("EnemyBullet", e_bullet_count, e_bullet_total // e_bullet_count if e_bullet_count else 0, e_bullet_total))
+        rows.append(("total", sum(row[1] for row in rows), 0, sum(row[3] for row in rows)))
+        return rows
 
     def draw_text(self, x, y, text, color, size=8):
         # Using pyxel.text directly as PyxelUniversalFont is not used
@@ -2270,8 +2792,7 @@ class App:
         pyxel.bltm(32+64, 0, 0, 64+32, 0, 32, 64)
 
         # Draw experience orbs (draw before player and enemies)
-        for orb in self.experience_orbs:
-            orb.draw()
+        self.experience_orbs.draw()
 
         # プレイヤーの描画条件を修正: ゲームオーバーでなく、かつGAME_CLEAR状態ではない場合に描画
         # バリアがアクティブな場合はプレイヤーの点滅を無効にする
@@ -2289,18 +2810,9 @@ class App:
             barrier_y = self.player_y
             pyxel.blt(int(barrier_x), int(barrier_y), 0, 24, 56, 8, 8, 0) # Barrier image (24,56)
 
-        for enemy in self.enemies:
-            enemy.draw()
-        for ghost in self.shot_ghosts:
-            ghost.draw()
-        for ghost in self.shield_ghosts:
-            ghost.draw()
-        for ghost in self.super_shield_ghosts:
-            ghost.draw()
-        for ghost in self.ultra_shot_ghosts: # New
-            ghost.draw()
-        for ghost in self.big_normal_ghosts: # New
-            ghost.draw()
+        for kind in ENEMY_KINDS:
+            for ghost in self.enemies.of_kind(kind):
+                ghost.draw()
 
         for attack in self.attacks:
             attack.draw()
@@ -2309,8 +2821,7 @@ class App:
         for bullet in self.bullets:
             bullet.draw()
         # Draw enemy bullets
-        for e_bullet in self.enemy_bullets:
-            e_bullet.draw()
+        self.enemy_bullets.draw()
 
         # Draw cutters (New)
         for cutter in self.cutters: